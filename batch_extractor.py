@@ -1,9 +1,18 @@
 import os
+import io
+import sys
+import contextlib
 import glob
 import zipfile
 import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
+from zip_extract_utils import discard_directory, extract_entries_parallel
+
+# ディレクトリ名に使えない文字を'_'へ置換する変換テーブル
+_UNSAFE_CHARS = str.maketrans({c: '_' for c in '\\/:*?"<>|'})
+
 def extract_docx_structure(docx_file_path, output_dir):
     """
     .docxファイルの構成要素を指定ディレクトリに展開する
@@ -19,9 +28,9 @@ def extract_docx_structure(docx_file_path, output_dir):
         if not os.path.exists(docx_file_path):
             return False, 0, 0
         
-        # 出力ディレクトリを作成（既存の場合は削除して再作成）
+        # 出力ディレクトリを作成（既存の場合は退避してバックグラウンドで削除）
         if os.path.exists(output_dir):
-            shutil.rmtree(output_dir)
+            discard_directory(output_dir)
         
         os.makedirs(output_dir, exist_ok=True)
         
@@ -30,27 +39,26 @@ def extract_docx_structure(docx_file_path, output_dir):
         
         with zipfile.ZipFile(docx_file_path, 'r') as zip_file:
             file_list = zip_file.filelist
+        
+        # 作成が必要なディレクトリを重複なく集めて、1回ずつ作成する
+        dirs = set()
+        entry_infos = []
+        for file_info in file_list:
+            if file_info.is_dir():
+                # ディレクトリの場合は作成のみ
+                dirs.add(os.path.join(output_dir, file_info.filename))
+                continue
             
-            for file_info in file_list:
-                if file_info.is_dir():
-                    # ディレクトリの場合は作成のみ
-                    dir_path = os.path.join(output_dir, file_info.filename)
-                    os.makedirs(dir_path, exist_ok=True)
-                    continue
-                
-                # ファイルを展開
-                file_data = zip_file.read(file_info.filename)
-                output_file_path = os.path.join(output_dir, file_info.filename)
-                
-                # 必要に応じてディレクトリを作成
-                os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-                
-                # ファイルを書き込み
-                with open(output_file_path, 'wb') as output_file:
-                    output_file.write(file_data)
-                
-                extracted_files += 1
-                total_extracted_size += file_info.file_size
+            dirs.add(os.path.dirname(os.path.join(output_dir, file_info.filename)))
+            entry_infos.append(file_info)
+            extracted_files += 1
+            total_extracted_size += file_info.file_size
+        
+        for dir_path in dirs:
+            os.makedirs(dir_path, exist_ok=True)
+        
+        # ファイルを展開
+        extract_entries_parallel(docx_file_path, entry_infos, output_dir)
         
         return True, extracted_files, total_extracted_size
         
@@ -73,18 +81,22 @@ def extract_pdf_structure(pdf_file_path, output_dir):
         tuple: (成功フラグ, ファイル数, ファイルサイズ)
     """
     try:
-        if not os.path.exists(pdf_file_path):
+        # stat結果はサイズ・更新日時・タイムスタンプ復元で使い回す
+        try:
+            pdf_stat = os.stat(pdf_file_path)
+        except FileNotFoundError:
             return False, 0, 0
         
         # 出力ディレクトリを作成
         os.makedirs(output_dir, exist_ok=True)
         
-        # PDFファイルをコピー
+        # PDFファイルをコピー（copyfileはLinuxではsendfileによるゼロコピー）
         filename = os.path.basename(pdf_file_path)
         output_path = os.path.join(output_dir, filename)
-        shutil.copy2(pdf_file_path, output_path)
+        shutil.copyfile(pdf_file_path, output_path)
+        os.utime(output_path, ns=(pdf_stat.st_atime_ns, pdf_stat.st_mtime_ns))
         
-        file_size = os.path.getsize(pdf_file_path)
+        file_size = pdf_stat.st_size
         
         # PDF構造情報をテキストファイルで出力
         info_file = os.path.join(output_dir, "pdf_info.txt")
@@ -93,7 +105,7 @@ def extract_pdf_structure(pdf_file_path, output_dir):
             f.write(f"=" * 50 + "\n")
             f.write(f"ファイル名: {filename}\n")
             f.write(f"ファイルサイズ: {file_size:,} bytes ({file_size / 1024 / 1024:.2f} MB)\n")
-            f.write(f"更新日時: {datetime.fromtimestamp(os.path.getmtime(pdf_file_path))}\n")
+            f.write(f"更新日時: {datetime.fromtimestamp(pdf_stat.st_mtime)}\n")
             f.write(f"\n注意: PDFファイルは単一構造のため、元ファイルをコピーしました。\n")
             f.write(f"詳細な構造解析にはPyMuPDF等の専用ライブラリが必要です。\n")
         
@@ -116,12 +128,8 @@ def get_safe_dirname(file_path):
     # ファイル名（拡張子なし）を取得
     basename = os.path.splitext(os.path.basename(file_path))[0]
     
-    # 安全でない文字を置換
-    safe_name = basename.replace('\\', '_').replace('/', '_').replace(':', '_')
-    safe_name = safe_name.replace('*', '_').replace('?', '_').replace('"', '_')
-    safe_name = safe_name.replace('<', '_').replace('>', '_').replace('|', '_')
-    
-    return safe_name
+    # 安全でない文字を1回の変換でまとめて置換
+    return basename.translate(_UNSAFE_CHARS)
 
 def count_media_files(structure_dir):
     """
@@ -134,20 +142,115 @@ def count_media_files(structure_dir):
         int: 画像ファイル数
     """
     media_dir = os.path.join(structure_dir, "word", "media")
-    if not os.path.exists(media_dir):
+    
+    # DirEntryの種別はreaddirの結果から得られるため追加のstatは発生しない
+    try:
+        with os.scandir(media_dir) as it:
+            return sum(1 for entry in it if entry.is_file(follow_symlinks=False))
+    except FileNotFoundError:
         return 0
+
+def _walk_stats(path):
+    """
+    ディレクトリ配下のファイル数と総サイズを1回の再帰走査で集計する
     
-    media_files = [f for f in os.listdir(media_dir) if os.path.isfile(os.path.join(media_dir, f))]
-    return len(media_files)
+    Args:
+        path (str): 集計対象のディレクトリ
+        
+    Returns:
+        tuple: (ファイル数, 総サイズ)
+    """
+    file_count = 0
+    total_size = 0
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    file_count += 1
+                    total_size += entry.stat(follow_symlinks=False).st_size
+    return file_count, total_size
 
-def batch_extract_all_files(search_directory="test_directry", output_base_dir="extracted_structures"):
+def _process_one(file_path, file_type, output_base_dir):
+    """
+    1ファイルを展開して統計情報を返す（ワーカープロセスで実行される）
+    
+    Args:
+        file_path (str): 対象ファイルのパス
+        file_type (str): 'docx' または 'pdf'
+        output_base_dir (str): 出力ベースディレクトリ
+        
+    Returns:
+        dict: 成功フラグ、展開ファイル数、総サイズ、画像数、出力ディレクトリ名とその集計、エラー内容、ログ出力
+    """
+    # 安全な出力ディレクトリ名を生成
+    safe_dirname = get_safe_dirname(file_path)
+    output_dir = os.path.join(output_base_dir, safe_dirname)
+    
+    stats = {
+        'success': False,
+        'file_count': 0,
+        'file_size': 0,
+        'image_count': 0,
+        'dirname': safe_dirname,
+        'dir_stats': None,
+        'error': None,
+        'log': '',
+    }
+    
+    # ワーカー内の出力はまとめて親プロセスへ返し、1回で書き出してもらう
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            if file_type == 'docx':
+                success, file_count, file_size = extract_docx_structure(file_path, output_dir)
+                image_count = count_media_files(output_dir) if success else 0
+                # 展開したエントリがそのまま出力ディレクトリの中身になる
+                dir_stats = (file_count, file_size) if success else None
+            else:  # pdf
+                success, file_count, file_size = extract_pdf_structure(file_path, output_dir)
+                image_count = 0  # PDFの画像カウントは現在未対応
+                # 情報ファイルのサイズを含めるため、2ファイルだけのディレクトリを集計する
+                dir_stats = _walk_stats(output_dir) if success else None
+        
+        stats.update(success=success, file_count=file_count, file_size=file_size,
+                     image_count=image_count, dir_stats=dir_stats)
+    except Exception as e:
+        stats['error'] = str(e)
+    
+    stats['log'] = log.getvalue()
+    return stats
+
+def _process_group(group, output_base_dir):
+    """
+    出力ディレクトリ名が同じファイル群を順番に展開する（ワーカープロセスで実行される）
+    
+    .docxの展開は既存の出力ディレクトリを退避してから行うため、同じディレクトリへの
+    展開を並行させると他のファイルの出力が消える。同名のファイルは1つのワーカーで逐次処理する
+    
+    Args:
+        group (list): (通し番号, ファイルパス, 種別) のリスト
+        output_base_dir (str): 出力ベースディレクトリ
+        
+    Returns:
+        list: 各ファイルの統計情報（_process_oneの戻り値）のリスト
+    """
+    return [_process_one(file_path, file_type, output_base_dir) for _, file_path, file_type in group]
+
+def batch_extract_all_files(search_directory="test_directry", output_base_dir="extracted_structures", verbose=None):
     """
     指定ディレクトリ内の全ての.docxと.pdfファイルを分解・展開する
     
     Args:
         search_directory (str): 検索対象のディレクトリ
         output_base_dir (str): 出力ベースディレクトリ
+        verbose (bool): 成功したファイルの行も表示するか（Noneの場合は標準出力が端末の時のみ表示）
     """
+    if verbose is None:
+        verbose = sys.stdout.isatty()
+    
     print("=" * 80)
     print("一括ファイル構造展開処理開始")
     print("=" * 80)
@@ -183,49 +286,90 @@ def batch_extract_all_files(search_directory="test_directry", output_base_dir="e
     total_extracted_size = 0
     total_images = 0
     
+    # 出力ディレクトリ名ごとのファイル数・サイズ（最後の一覧表示で使う）
+    stats_by_dirname = {}
+    # 同名の出力ディレクトリに複数ファイルが展開された場合は集計を信用しない
+    seen_dirnames = set()
+    
     print("処理中...")
     print(f"{'No':<4} {'ファイル名':<40} {'種別':<6} {'結果':<8} {'ファイル数':<8} {'サイズ':<12} {'画像数'}")
     print("-" * 95)
     
+    # 出力ディレクトリ名が同じファイルは同じディレクトリへ展開されるため1つのタスクにまとめる
+    groups = {}
     for idx, (file_path, file_type) in enumerate(all_files, 1):
-        # 相対パスを取得
-        rel_path = os.path.relpath(file_path, search_directory)
-        filename = os.path.basename(file_path)
-        
-        # 安全な出力ディレクトリ名を生成
-        safe_dirname = get_safe_dirname(file_path)
-        output_dir = os.path.join(output_base_dir, safe_dirname)
+        groups.setdefault(get_safe_dirname(file_path), []).append((idx, file_path, file_type))
+    
+    # 出力ディレクトリごとの展開は互いに独立しているためプロセス並列で実行
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = {
+            executor.submit(_process_group, group, output_base_dir): group
+            for group in groups.values()
+        }
         
-        try:
-            if file_type == 'docx':
-                success, file_count, file_size = extract_docx_structure(file_path, output_dir)
-                image_count = count_media_files(output_dir) if success else 0
-            else:  # pdf
-                success, file_count, file_size = extract_pdf_structure(file_path, output_dir)
-                image_count = 0  # PDFの画像カウントは現在未対応
-            
-            if success:
-                success_count += 1
-                total_extracted_files += file_count
-                total_extracted_size += file_size
-                total_images += image_count
-                result = "成功"
-            else:
-                fail_count += 1
-                result = "失敗"
-                file_count = 0
-                file_size = 0
-                image_count = 0
-            
-            # サイズの表示形式
-            size_str = f"{file_size / 1024 / 1024:.1f}MB" if file_size > 0 else "0MB"
+        # 完了した順に結果を表示（1ファイル分の出力はまとめて1回で書き出す）
+        for future in as_completed(futures):
+            group = futures[future]
+            try:
+                group_stats = future.result()
+                group_error = None
+            except Exception as e:
+                # ワーカー自体が失敗した場合はグループ内の全ファイルをエラーとして扱う
+                group_stats = [None] * len(group)
+                group_error = e
             
-            print(f"{idx:<4} {filename:<40} {file_type.upper():<6} {result:<8} {file_count:<8} {size_str:<12} {image_count}")
-            
-        except Exception as e:
-            fail_count += 1
-            print(f"{idx:<4} {filename:<40} {file_type.upper():<6} {'エラー':<8} {'0':<8} {'0MB':<12} 0")
-            print(f"    → エラー詳細: {str(e)}")
+            for (idx, file_path, file_type), stats in zip(group, group_stats):
+                filename = os.path.basename(file_path)
+                buf = []
+                
+                try:
+                    if stats is None:
+                        raise group_error
+                    buf.append(stats['log'])
+                    
+                    dirname = stats['dirname']
+                    if dirname in seen_dirnames:
+                        stats_by_dirname.pop(dirname, None)
+                    else:
+                        seen_dirnames.add(dirname)
+                        if stats['dir_stats'] is not None:
+                            stats_by_dirname[dirname] = stats['dir_stats']
+                    if stats['error'] is not None:
+                        raise RuntimeError(stats['error'])
+                    
+                    success = stats['success']
+                    file_count = stats['file_count']
+                    file_size = stats['file_size']
+                    image_count = stats['image_count']
+                    
+                    if success:
+                        success_count += 1
+                        total_extracted_files += file_count
+                        total_extracted_size += file_size
+                        total_images += image_count
+                        result = "成功"
+                    else:
+                        fail_count += 1
+                        result = "失敗"
+                        file_count = 0
+                        file_size = 0
+                        image_count = 0
+                    
+                    # 成功行は詳細表示時のみ整形する（失敗行は常に表示）
+                    if verbose or not success:
+                        # サイズの表示形式
+                        size_str = f"{file_size / 1024 / 1024:.1f}MB" if file_size > 0 else "0MB"
+                        
+                        buf.append(f"{idx:<4} {filename:<40} {file_type.upper():<6} {result:<8} {file_count:<8} {size_str:<12} {image_count}\n")
+                    
+                except Exception as e:
+                    fail_count += 1
+                    buf.append(f"{idx:<4} {filename:<40} {file_type.upper():<6} {'エラー':<8} {'0':<8} {'0MB':<12} 0\n")
+                    buf.append(f"    → エラー詳細: {str(e)}\n")
+                
+                output = ''.join(buf)
+                if output:
+                    sys.stdout.write(output)
     
     print("-" * 95)
     print()
@@ -247,14 +391,18 @@ def batch_extract_all_files(search_directory="test_directry", output_base_dir="e
         print("展開されたディレクトリ一覧:")
         print("-" * 50)
         try:
-            for item in sorted(os.listdir(output_base_dir)):
-                item_path = os.path.join(output_base_dir, item)
-                if os.path.isdir(item_path):
-                    # ディレクトリ内のファイル数を数える
-                    file_count = sum(len(files) for _, _, files in os.walk(item_path))
-                    dir_size = sum(os.path.getsize(os.path.join(dirpath, filename))
-                                 for dirpath, _, filenames in os.walk(item_path)
-                                 for filename in filenames)
+            with os.scandir(output_base_dir) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+            
+            for entry in entries:
+                item = entry.name
+                item_path = entry.path
+                if entry.is_dir():
+                    # 展開時の集計を使い、無い場合のみディレクトリを走査して集計
+                    dir_stats = stats_by_dirname.get(item)
+                    if dir_stats is None:
+                        dir_stats = _walk_stats(item_path)
+                    file_count, dir_size = dir_stats
                     print(f"  {item:<30} ({file_count} ファイル, {dir_size / 1024 / 1024:.1f} MB)")
         except Exception:
             print("  ディレクトリ一覧の取得に失敗しました")
@@ -1,16 +1,23 @@
 import os
+import sys
 import zipfile
-import shutil
+import functools
 from datetime import datetime
 
-def extract_docx_structure(docx_file_path, output_dir="word/structure"):
+from zip_extract_utils import discard_directory, extract_entries_parallel
+
+def extract_docx_structure(docx_file_path, output_dir="word/structure", verbose=None):
     """
     .docxファイルの構成要素を指定ディレクトリに展開する
     
     Args:
         docx_file_path (str): .docxファイルのパス
         output_dir (str): 出力ディレクトリのパス
+        verbose (bool): エントリごとの一覧を表示するか（Noneの場合は標準出力が端末の時のみ表示）
     """
+    if verbose is None:
+        verbose = sys.stdout.isatty()
+    
     try:
         if not os.path.exists(docx_file_path):
             print(f"ファイルが見つかりません: {docx_file_path}")
@@ -20,10 +27,10 @@ def extract_docx_structure(docx_file_path, output_dir="word/structure"):
         print(f"DOCX構成要素展開: {docx_file_path}")
         print("=" * 80)
         
-        # 出力ディレクトリを作成（既存の場合は削除して再作成）
+        # 出力ディレクトリを作成（既存の場合は退避してバックグラウンドで削除）
         if os.path.exists(output_dir):
             print(f"既存のディレクトリを削除中: {output_dir}")
-            shutil.rmtree(output_dir)
+            discard_directory(output_dir)
         
         os.makedirs(output_dir, exist_ok=True)
         print(f"出力ディレクトリを作成: {output_dir}")
@@ -43,35 +50,37 @@ def extract_docx_structure(docx_file_path, output_dir="word/structure"):
             
             # 進捗表示用
             print("展開中...")
-            print(f"{'No':<4} {'ファイル名':<60} {'サイズ':<12} {'種別'}")
-            print("-" * 85)
+            if verbose:
+                print(f"{'No':<4} {'ファイル名':<60} {'サイズ':<12} {'種別'}")
+                print("-" * 85)
             
+            # 作成が必要なディレクトリを重複なく集めて、1回ずつ作成する
+            dirs = set()
+            entry_infos = []
             for idx, file_info in enumerate(file_list, 1):
                 if file_info.is_dir():
                     # ディレクトリの場合は作成のみ
-                    dir_path = os.path.join(output_dir, file_info.filename)
-                    os.makedirs(dir_path, exist_ok=True)
+                    dirs.add(os.path.join(output_dir, file_info.filename))
                     continue
                 
-                # ファイルを展開
-                file_data = zip_file.read(file_info.filename)
-                output_file_path = os.path.join(output_dir, file_info.filename)
-                
-                # 必要に応じてディレクトリを作成
-                os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-                
-                # ファイルを書き込み
-                with open(output_file_path, 'wb') as output_file:
-                    output_file.write(file_data)
+                dirs.add(os.path.dirname(os.path.join(output_dir, file_info.filename)))
+                entry_infos.append(file_info)
                 
-                # ファイル種別を判定
-                file_type = get_file_type(file_info.filename)
-                
-                print(f"{idx:<4} {file_info.filename:<60} {file_info.file_size:<12,} {file_type}")
+                if verbose:
+                    # ファイル種別を判定
+                    file_type = get_file_type(file_info.filename)
+                    
+                    print(f"{idx:<4} {file_info.filename:<60} {file_info.file_size:<12,} {file_type}")
                 
                 extracted_files += 1
                 total_extracted_size += file_info.file_size
         
+        for dir_path in dirs:
+            os.makedirs(dir_path, exist_ok=True)
+        
+        # ファイルを展開
+        extract_entries_parallel(docx_file_path, entry_infos, output_dir)
+        
         print("-" * 85)
         print(f"展開完了: {extracted_files} ファイル")
         print(f"総展開サイズ: {total_extracted_size:,} bytes ({total_extracted_size / 1024 / 1024:.2f} MB)")
@@ -95,6 +104,7 @@ def extract_docx_structure(docx_file_path, output_dir="word/structure"):
     except Exception as e:
         print(f"エラーが発生しました: {str(e)}")
 
+@functools.lru_cache(maxsize=4096)
 def get_file_type(filename):
     """
     ファイル名から種別を判定する
@@ -145,19 +155,20 @@ def show_directory_tree(root_dir, prefix="", max_depth=3, current_depth=0):
         return
     
     try:
-        items = os.listdir(root_dir)
-        items.sort()
+        # scandirのDirEntryで種別・サイズを取得（エントリごとのstatを省く）
+        with os.scandir(root_dir) as it:
+            items = sorted(it, key=lambda entry: entry.name)
         
-        for i, item in enumerate(items):
-            item_path = os.path.join(root_dir, item)
+        for i, entry in enumerate(items):
+            item = entry.name
             is_last = i == len(items) - 1
             
-            if os.path.isdir(item_path):
+            if entry.is_dir():
                 print(f"{prefix}{'└── ' if is_last else '├── '}{item}/")
                 extension = "    " if is_last else "│   "
-                show_directory_tree(item_path, prefix + extension, max_depth, current_depth + 1)
+                show_directory_tree(entry.path, prefix + extension, max_depth, current_depth + 1)
             else:
-                file_size = os.path.getsize(item_path)
+                file_size = entry.stat().st_size
                 print(f"{prefix}{'└── ' if is_last else '├── '}{item} ({file_size:,} bytes)")
     except PermissionError:
         print(f"{prefix}[アクセス権限エラー]")
@@ -180,14 +191,18 @@ def show_media_files_info(root_dir):
     print("展開された画像ファイル詳細:")
     print("=" * 80)
     
+    # 1エントリにつきstatは1回だけ（サイズと更新日時を同じ結果から取得）
     media_files = []
-    for filename in os.listdir(media_dir):
-        file_path = os.path.join(media_dir, filename)
-        if os.path.isfile(file_path):
-            file_size = os.path.getsize(file_path)
-            file_ext = os.path.splitext(filename)[1].lower()
-            modified_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-            media_files.append((filename, file_size, file_ext, modified_time, file_path))
+    splitext = os.path.splitext
+    fromtimestamp = datetime.fromtimestamp
+    with os.scandir(media_dir) as it:
+        for entry in it:
+            if entry.is_file(follow_symlinks=False):
+                st = entry.stat()
+                file_size = st.st_size
+                file_ext = splitext(entry.name)[1].lower()
+                modified_time = fromtimestamp(st.st_mtime)
+                media_files.append((entry.name, file_size, file_ext, modified_time, entry.path))
     
     if not media_files:
         print("画像ファイルが見つかりませんでした。")
@@ -29,29 +29,54 @@ def show_docx_zip_info(docx_file_path):
             # ZIP全体の情報
             file_list = zip_file.filelist
             total_files = len(file_list)
-            total_compressed_size = sum(info.compress_size for info in file_list)
-            total_uncompressed_size = sum(info.file_size for info in file_list)
             
-            print(f"総ファイル数: {total_files}")
-            print(f"圧縮後サイズ: {total_compressed_size:,} bytes")
-            print(f"展開後サイズ: {total_uncompressed_size:,} bytes")
-            print(f"圧縮率: {(1 - total_compressed_size / total_uncompressed_size) * 100:.1f}%")
-            print()
-            
-            # ディレクトリ別ファイル数
+            # 合計サイズ・ディレクトリ別の分類・画像ファイルの抽出を1回の走査で行う
+            total_compressed_size = 0
+            total_uncompressed_size = 0
+            total_image_size = 0
             directories = {}
-            for info in file_list:
+            media_files = []
+            # 詳細一覧用の列データ（ディレクトリを除くエントリ）
+            row_numbers = []
+            names = []
+            sizes = []
+            compress_sizes = []
+            date_times = []
+            for idx, info in enumerate(file_list, 1):
+                file_size = info.file_size
+                compress_size = info.compress_size
+                total_compressed_size += compress_size
+                total_uncompressed_size += file_size
+                
                 if info.is_dir():
                     continue
                 
-                dir_name = os.path.dirname(info.filename)
+                filename = info.filename
+                row_numbers.append(idx)
+                names.append(filename)
+                sizes.append(file_size)
+                compress_sizes.append(compress_size)
+                date_times.append(info.date_time)
+                
+                dir_name = os.path.dirname(filename)
                 if dir_name == '':
                     dir_name = '(ルート)'
                 
                 if dir_name not in directories:
                     directories[dir_name] = []
                 directories[dir_name].append(info)
+                
+                if filename.startswith('word/media/'):
+                    media_files.append(info)
+                    total_image_size += file_size
+            
+            print(f"総ファイル数: {total_files}")
+            print(f"圧縮後サイズ: {total_compressed_size:,} bytes")
+            print(f"展開後サイズ: {total_uncompressed_size:,} bytes")
+            print(f"圧縮率: {(1 - total_compressed_size / total_uncompressed_size) * 100:.1f}%")
+            print()
             
+            # ディレクトリ別ファイル数
             print("ディレクトリ別ファイル数:")
             for dir_name, files in sorted(directories.items()):
                 print(f"  {dir_name}: {len(files)} ファイル")
@@ -64,23 +89,20 @@ def show_docx_zip_info(docx_file_path):
             print(f"{'No':<4} {'ファイル名':<50} {'サイズ':<12} {'圧縮後':<12} {'圧縮率':<8} {'更新日時'}")
             print("-" * 95)
             
-            for idx, info in enumerate(file_list, 1):
-                if info.is_dir():
-                    continue
-                
-                # 圧縮率計算
-                if info.file_size > 0:
-                    compression_ratio = (1 - info.compress_size / info.file_size) * 100
-                else:
-                    compression_ratio = 0
-                
+            # 圧縮率を列単位でまとめて計算
+            compression_ratios = [
+                (1 - compress_size / file_size) * 100 if file_size > 0 else 0
+                for file_size, compress_size in zip(sizes, compress_sizes)
+            ]
+            
+            for idx, filename, file_size, compress_size, compression_ratio, date_time in zip(
+                    row_numbers, names, sizes, compress_sizes, compression_ratios, date_times):
                 # 更新日時
-                file_datetime = datetime(*info.date_time)
+                file_datetime = datetime(*date_time)
                 
-                print(f"{idx:<4} {info.filename:<50} {info.file_size:<12,} {info.compress_size:<12,} {compression_ratio:<7.1f}% {file_datetime}")
+                print(f"{idx:<4} {filename:<50} {file_size:<12,} {compress_size:<12,} {compression_ratio:<7.1f}% {file_datetime}")
             
             # 画像ファイル詳細
-            media_files = [info for info in file_list if info.filename.startswith('word/media/') and not info.is_dir()]
             if media_files:
                 print()
                 print("=" * 80)
@@ -98,7 +120,6 @@ def show_docx_zip_info(docx_file_path):
                 
                 print()
                 print(f"総画像ファイル数: {len(media_files)}")
-                total_image_size = sum(info.file_size for info in media_files)
                 print(f"総画像サイズ: {total_image_size:,} bytes ({total_image_size / 1024 / 1024:.2f} MB)")
         
         print("=" * 80)
@@ -1,14 +1,181 @@
 import os
-import glob
-import pandas as pd
+import sys
+import csv
+import pickle
 import zipfile
+import zlib
+import time
 from PIL import Image
+import pymupdf
 import io
-import tempfile
 import shutil
+import contextlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
 from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.dimensions import RowDimension
 from openpyxl.drawing.image import Image as OpenpyxlImage
-from openpyxl.utils.dataframe import dataframe_to_rows
+
+# 画像チェック・Excel用の画像の準備を並列実行するプロセス数
+MAX_WORKERS = os.cpu_count() or 1
+
+# 画像チェック前に先読みを依頼する各ファイル末尾のバイト数
+# （zipの中央ディレクトリやPDFのxref・trailerはファイル末尾にある）
+PREFETCH_TAIL_SIZE = 64 * 1024
+
+# os.posix_fadviseが使える環境か（Windows・macOSでは使えない）
+_HAS_FADVISE = hasattr(os, 'posix_fadvise')
+
+# ディレクトリの読み込みを並列実行するスレッド数
+# （macOSのAPFSは同じボリュームのディレクトリ読み込みを直列化するため少なめにする）
+CRAWL_THREADS = min(4 if sys.platform == 'darwin' else 8, os.cpu_count() or 1)
+
+# .docxの内部構造の展開を並列実行するスレッド数
+STRUCTURE_THREADS = min(4, os.cpu_count() or 1)
+
+# 対象とする拡張子と種別名
+FILE_KINDS = {'.docx': 'DOCX', '.pdf': 'PDF'}
+
+# 画像数の調査（列数の決定）を並列実行するスレッド数
+PROBE_THREADS = min(4, os.cpu_count() or 1)
+
+# .docxの画像データや全体を読み込むときの読み込みバッファのサイズ
+# （標準の8KBでは大きな画像の展開時に読み込みのシステムコールが多くなる）
+ZIP_READ_BUFFER_SIZE = 1024 * 1024
+
+# .docx内の画像が格納されているフォルダ
+MEDIA_PREFIX = 'word/media/'
+
+# ワーカープロセス内でExcel用の画像の縮小・PNG変換を並列実行するスレッド数
+# （PillowはリサイズやzlibによるエンコードのあいだGILを解放する）
+IMAGE_THREADS = max(1, (os.cpu_count() or 1) // MAX_WORKERS)
+
+# 実行をまたいでファイルごとの調査結果を再利用するキャッシュファイル
+SCAN_CACHE_PATH = os.path.join("result", ".cache.pkl")
+# {ファイルパス: [更新日時(ns), ファイルサイズ, 画像の有無, 画像ファイル名のリスト, 抽出できる画像数, 画像の参照数]}
+# （未調査の項目はNone。更新日時とサイズが変わったファイルは調査し直す）
+# 画像ファイル名のリストは.docx、抽出できる画像数と画像の参照数は.pdfで使う
+_scan_cache = {}
+
+def load_scan_cache(cache_path=SCAN_CACHE_PATH):
+    """
+    前回までの実行で保存したファイルごとの調査結果を読み込む
+    
+    Args:
+        cache_path (str): キャッシュファイルのパス
+    """
+    try:
+        with open(cache_path, 'rb') as cache_file:
+            cache = pickle.load(cache_file)
+        if isinstance(cache, dict):
+            _scan_cache.update(cache)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"キャッシュ読み込みエラー（キャッシュを使わずに続行）: {str(e)}")
+
+def save_scan_cache(cache_path=SCAN_CACHE_PATH):
+    """
+    ファイルごとの調査結果をキャッシュファイルに保存する
+    （書き込み途中のファイルが残らないよう、一時ファイルに書いてから置き換える）
+    
+    Args:
+        cache_path (str): キャッシュファイルのパス
+    """
+    try:
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, 'wb') as cache_file:
+            pickle.dump(_scan_cache, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except Exception as e:
+        print(f"キャッシュ保存エラー: {str(e)}")
+
+def _get_scan_cache_entry(file_path):
+    """
+    ファイルの調査結果キャッシュを取得する（ファイルが更新されていれば空の結果に作り直す）
+    
+    Args:
+        file_path (str): ファイルパス
+        
+    Returns:
+        list: [更新日時(ns), ファイルサイズ, 画像の有無, 画像ファイル名のリスト, 抽出できる画像数, 画像の参照数]
+              （statできない場合はNone）
+    """
+    try:
+        stat_result = os.stat(file_path)
+    except OSError:
+        return None
+    
+    entry = _scan_cache.get(file_path)
+    if (entry is None or len(entry) != 6
+            or entry[0] != stat_result.st_mtime_ns or entry[1] != stat_result.st_size):
+        entry = [stat_result.st_mtime_ns, stat_result.st_size, None, None, None, None]
+        _scan_cache[file_path] = entry
+    return entry
+
+def _flush_log(log):
+    """
+    溜めておいたログ行をまとめて標準出力に書き出す
+    
+    Args:
+        log (list): ログ行のリスト（書き出した後は空になる）
+    """
+    if log:
+        sys.stdout.write('\n'.join(log) + '\n')
+        log.clear()
+
+def get_file_kind(file_path):
+    """
+    拡張子からファイル種別を判定する
+    
+    Args:
+        file_path (str): ファイルパス
+        
+    Returns:
+        str: 'DOCX' または 'PDF'（対象外の場合はNone）
+    """
+    return FILE_KINDS.get(os.path.splitext(file_path)[1].lower())
+
+def _scan_directory(dir_path):
+    """
+    1つのディレクトリを読み込み、サブディレクトリと .docx・.pdf ファイルに振り分ける
+    （DirEntryの種別情報を使い、ファイルごとのstat・access呼び出しを省く）
+    
+    Args:
+        dir_path (str): 読み込むディレクトリのパス
+        
+    Returns:
+        tuple: (サブディレクトリのリスト, .docxファイルのリスト, .pdfファイルのリスト)
+    """
+    sub_dirs = []
+    docx_files = []
+    pdf_files = []
+    try:
+        with os.scandir(dir_path) as it:
+            entries = list(it)
+    except OSError:
+        return sub_dirs, docx_files, pdf_files
+    
+    for entry in entries:
+        # 従来の検索と同様に隠しファイル・隠しディレクトリは対象外
+        if entry.name.startswith('.'):
+            continue
+        try:
+            # 拡張子は名前だけで判定できるので先に調べ、対象のファイルではis_dir()を呼ばない
+            if entry.name.endswith(('.docx', '.pdf')) and entry.is_file():
+                if entry.name.endswith('.docx'):
+                    docx_files.append(entry.path)
+                else:
+                    pdf_files.append(entry.path)
+            elif entry.is_dir():
+                sub_dirs.append(entry.path)
+        except OSError:
+            continue
+    return sub_dirs, docx_files, pdf_files
 
 def extract_docx_pdf_files(directory_path):
     """
@@ -29,289 +196,521 @@ def extract_docx_pdf_files(directory_path):
             print(f"警告: ディレクトリが存在しません: {directory_path}")
             return found_files
         
-        # .docx ファイルを検索
-        docx_pattern = os.path.join(directory_path, "**", "*.docx")
-        docx_files = glob.glob(docx_pattern, recursive=True)
-        # 有効なファイルのみを追加
-        for file_path in docx_files:
-            if os.path.isfile(file_path) and os.access(file_path, os.R_OK):
-                found_files.append(file_path)
-        
-        # .pdf ファイルを検索
-        pdf_pattern = os.path.join(directory_path, "**", "*.pdf")
-        pdf_files = glob.glob(pdf_pattern, recursive=True)
-        # 有効なファイルのみを追加
-        for file_path in pdf_files:
-            if os.path.isfile(file_path) and os.access(file_path, os.R_OK):
-                found_files.append(file_path)
+        # 同じ深さのディレクトリをスレッドで並列に読み込む
+        # （結果はディレクトリごとに保持し、並び順は後でまとめて決める）
+        scanned = {}
+        level = [directory_path]
+        with ThreadPoolExecutor(max_workers=CRAWL_THREADS) as executor:
+            while level:
+                next_level = []
+                for current_dir, result in zip(level, executor.map(_scan_directory, level)):
+                    scanned[current_dir] = result
+                    next_level.extend(result[0])
+                level = next_level
+        
+        # 深さ優先で、ディレクトリ内の並び順どおりに辿って .docx と .pdf を振り分ける
+        docx_files = []
+        pdf_files = []
+        stack = [directory_path]
+        while stack:
+            sub_dirs, dir_docx_files, dir_pdf_files = scanned[stack.pop()]
+            docx_files.extend(dir_docx_files)
+            pdf_files.extend(dir_pdf_files)
+            stack.extend(reversed(sub_dirs))
+        
+        # 従来どおり .docx を先に、.pdf を後に並べる
+        found_files.extend(docx_files)
+        found_files.extend(pdf_files)
     
     except Exception as e:
         print(f"ファイル検索エラー: {str(e)}")
     
     return found_files
 
-def has_images_in_docx(file_path):
+def scan_docx_media(file_path):
     """
-    .docxファイルに画像が含まれているかチェックする
+    .docxファイルを1回だけ開き、画像ファイル名のリストを取得する（実際の順序を保持）
+    画像の有無はリストが空かどうかで判定できる
     
     Args:
         file_path (str): .docxファイルのパス
         
     Returns:
-        bool: 画像が含まれている場合True
+        list: 画像ファイル名のリスト（Word内の実際の順序。読み込めない場合はNone）
     """
     try:
         # ファイルの存在とアクセス権限をチェック
         if not os.path.exists(file_path) or not os.access(file_path, os.R_OK):
-            return False
+            return None
             
+        # ファイル名だけが必要なので画像データは読み込まない
         with zipfile.ZipFile(file_path, 'r') as zip_file:
-            # word/media/ フォルダ内のファイルをチェック
-            for file_info in zip_file.filelist:
-                if file_info.filename.startswith('word/media/'):
-                    return True
-        return False
+            return [os.path.basename(file_info.filename) for file_info in _iter_media_infos(zip_file)]
     except (zipfile.BadZipFile, PermissionError, OSError) as e:
         print(f"  → docxファイル読み込みエラー: {str(e)}")
-        return False
+        return None
     except Exception:
-        return False
+        return None
 
-def get_media_filenames(file_path):
+def _iter_media_infos(zip_file):
     """
-    .docxファイル内の画像ファイル名のリストを取得する（実際の順序を保持）
+    開いている.docx(zip)内の word/media/ 配下のエントリ情報を実際の順序で1つずつ返す
+    （途中のリストを作らず、エントリの一覧を1回だけ走査する）
     
     Args:
-        file_path (str): .docxファイルのパス
+        zip_file (zipfile.ZipFile): 開いている.docxファイル
         
-    Returns:
-        list: 画像ファイル名のリスト（Word内の実際の順序）
+    Yields:
+        zipfile.ZipInfo: word/media/ 配下のエントリ情報（Word内の実際の順序）
     """
-    media_filenames = []
-    try:
-        # ファイルの存在とアクセス権限をチェック
-        if not os.path.exists(file_path) or not os.access(file_path, os.R_OK):
-            return media_filenames
-            
-        with zipfile.ZipFile(file_path, 'r') as zip_file:
-            # word/media/ フォルダ内のファイルを実際の順序で取得
-            for file_info in zip_file.filelist:
-                if file_info.filename.startswith('word/media/') and not file_info.is_dir():
-                    # ファイル名のみを取得
-                    filename = os.path.basename(file_info.filename)
-                    media_filenames.append(filename)
-        
-    except (zipfile.BadZipFile, PermissionError, OSError) as e:
-        print(f"  → docxファイル処理エラー: {str(e)}")
-    except Exception:
-        pass
-    return media_filenames
+    for file_info in zip_file.filelist:
+        filename = file_info.filename
+        # ディレクトリのエントリ（末尾が / の名前）は除く
+        if filename.startswith(MEDIA_PREFIX) and not filename.endswith('/'):
+            yield file_info
 
-def extract_images_from_docx(file_path):
+def iter_docx_media(file_path):
     """
-    .docxファイルから画像を抽出する（Word内の実際の順序を保持）
+    .docxファイルを1回だけ開き、画像ファイル名と画像データのストリームを順に返す（Word内の実際の順序を保持）
+    
+    画像データは一括で読み込まず、zip内のエントリを直接読むストリームとして渡す。
+    ストリームは次の要素を取り出すまでの間だけ有効。
     
     Args:
         file_path (str): .docxファイルのパス
         
-    Returns:
-        list: 抽出された画像のPILImageオブジェクトのリスト（Word内の実際の順序）
+    Yields:
+        tuple: (画像ファイル名, 画像データのストリーム。読み込みに失敗した場合・空のファイルはNone)
     """
-    images = []
     try:
         # ファイルの存在とアクセス権限をチェック
         if not os.path.exists(file_path) or not os.access(file_path, os.R_OK):
-            return images
+            return
             
-        with zipfile.ZipFile(file_path, 'r') as zip_file:
-            # Word内の実際の順序でファイルを取得
-            media_files = []
-            for file_info in zip_file.filelist:
-                if file_info.filename.startswith('word/media/') and not file_info.is_dir():
-                    media_files.append(file_info.filename)
-            
-            # 実際の順序で画像を処理
-            for filename in media_files:
+        # 画像データ全体を読むため、大きめのバッファで読み込みのシステムコールを減らす
+        with open(file_path, 'rb', buffering=ZIP_READ_BUFFER_SIZE) as docx_file, \
+                zipfile.ZipFile(docx_file, 'r') as zip_file:
+            for file_info in _iter_media_infos(zip_file):
+                filename = os.path.basename(file_info.filename)
+                if file_info.file_size == 0:  # 空のファイル
+                    yield filename, None
+                    continue
                 try:
-                    # 画像データを読み込み
-                    image_data = zip_file.read(filename)
-                    if len(image_data) == 0:  # 空のファイルをスキップ
-                        # プレースホルダー画像を作成
-                        placeholder = Image.new('RGB', (100, 100), color='lightgray')
-                        images.append(placeholder)
-                        continue
-                        
-                    # PILImageオブジェクトに変換
-                    try:
-                        image = Image.open(io.BytesIO(image_data))
-                        # 画像形式を確認してRGBに変換
-                        if image.mode in ('RGBA', 'LA', 'P'):
-                            image = image.convert('RGB')
-                        images.append(image)
-                    except (Image.UnidentifiedImageError, OSError) as e:
-                        print(f"    → 画像読み込みエラー ({filename}): {str(e)}")
-                        # エラーの場合はプレースホルダー画像を作成
-                        placeholder = Image.new('RGB', (100, 100), color='lightgray')
-                        # エラーメッセージをテキストとして追加
-                        from PIL import ImageDraw, ImageFont
-                        draw = ImageDraw.Draw(placeholder)
-                        try:
-                            # フォントサイズを小さく設定
-                            draw.text((10, 40), "読込不可", fill='black')
-                            draw.text((10, 55), os.path.basename(filename)[:10], fill='black')
-                        except:
-                            pass
-                        images.append(placeholder)
-                        continue
+                    image_stream = zip_file.open(file_info, 'r')
                 except Exception as e:
                     print(f"    → ファイル処理エラー ({filename}): {str(e)}")
-                    # エラーの場合はプレースホルダー画像を作成
-                    placeholder = Image.new('RGB', (100, 100), color='lightgray')
-                    images.append(placeholder)
+                    yield filename, None
                     continue
+                with image_stream:
+                    yield filename, image_stream
     except (zipfile.BadZipFile, PermissionError, OSError) as e:
         print(f"  → docxファイル処理エラー: {str(e)}")
     except Exception:
         pass
-    return images
 
-def has_images_in_pdf(file_path):
+def get_media_filenames(file_path):
+    """
+    .docxファイル内の画像ファイル名のリストを取得する（実際の順序を保持）
+    
+    Args:
+        file_path (str): .docxファイルのパス
+        
+    Returns:
+        list: 画像ファイル名のリスト（Word内の実際の順序）
+    """
+    # 調査済みで更新されていないファイルはキャッシュの結果を使う
+    cache_entry = _get_scan_cache_entry(file_path)
+    if cache_entry is not None and cache_entry[3] is not None:
+        return list(cache_entry[3])
+    
+    media_filenames = scan_docx_media(file_path)
+    if media_filenames is None:
+        return []
+    if cache_entry is not None:
+        cache_entry[3] = media_filenames
+    return list(media_filenames)
+
+def _open_docx_image(filename, image_stream, draft_size=None):
     """
-    .pdfファイルに画像が含まれているかチェックする
+    .docxの画像データのストリームからPILImageオブジェクトを作成する
+    
+    Args:
+        filename (str): 画像ファイル名
+        image_stream: 画像データのストリーム（読み込みに失敗した場合・空のファイルはNone）
+        draft_size (tuple): 縮小して使う場合の目安サイズ（JPEGは展開時にこのサイズまで縮小する）
+        
+    Returns:
+        PILImageオブジェクト: 変換された画像（変換できない場合はプレースホルダー画像）
+    """
+    if image_stream is None:  # 読み込み失敗・空のファイル
+        # プレースホルダー画像を作成
+        return Image.new('RGB', (100, 100), color='lightgray')
+    
+    # PILImageオブジェクトに変換
+    # （zip内のエントリを直接読み、bytesへの一括読み込みと全体のCRC計算を省く）
+    try:
+        image = Image.open(image_stream)
+        if draft_size:
+            # JPEGは展開前に縮小デコードを指定する（JPEG以外では何もしない）
+            image.draft(None, draft_size)
+        # ストリームが閉じられる前に画素データを読み込んでおく
+        # （RGBへの変換は縮小後にPNGへ変換するときだけ行う）
+        image.load()
+        return image
+    except (Image.UnidentifiedImageError, OSError) as e:
+        print(f"    → 画像読み込みエラー ({filename}): {str(e)}")
+        # エラーの場合はプレースホルダー画像を作成
+        placeholder = Image.new('RGB', (100, 100), color='lightgray')
+        # エラーメッセージをテキストとして追加
+        from PIL import ImageDraw, ImageFont
+        draw = ImageDraw.Draw(placeholder)
+        try:
+            # フォントサイズを小さく設定
+            draw.text((10, 40), "読込不可", fill='black')
+            draw.text((10, 55), filename[:10], fill='black')
+        except:
+            pass
+        return placeholder
+    except Exception as e:
+        print(f"    → ファイル処理エラー ({filename}): {str(e)}")
+        # エラーの場合はプレースホルダー画像を作成
+        return Image.new('RGB', (100, 100), color='lightgray')
+
+def scan_pdf_images(file_path):
+    """
+    .pdfファイルを1回だけ開き、画像を展開せずに画像の参照数を数える
+    （複数ページで共有されている画像は1つと数える。画像の有無は0かどうかで判定できる）
     
     Args:
         file_path (str): .pdfファイルのパス
         
     Returns:
-        bool: 画像が含まれている場合True
+        int: 画像の参照数（読み込めない場合はNone）
     """
     try:
         # ファイルの存在とアクセス権限をチェック
         if not os.path.exists(file_path) or not os.access(file_path, os.R_OK):
-            return False
-            
-        import PyPDF2
-        with open(file_path, 'rb') as pdf_file:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            return None
             
-            # 暗号化されたPDFの場合
-            if pdf_reader.is_encrypted:
-                try:
-                    pdf_reader.decrypt('')  # 空のパスワードで試行
-                except:
-                    print(f"  → 暗号化されたPDFです: {file_path}")
-                    return False
+        with pymupdf.open(file_path) as doc:
+            # 暗号化されたPDFの場合は空のパスワードで試行
+            if doc.needs_pass and not doc.authenticate(''):
+                print(f"  → 暗号化されたPDFです: {file_path}")
+                return None
             
-            for page_num, page in enumerate(pdf_reader.pages):
+            # ページオブジェクトを作らずにリソース辞書から画像の参照を調べる
+            image_xrefs = set()
+            for page_num in range(doc.page_count):
                 try:
-                    if '/Resources' in page and '/XObject' in page['/Resources']:
-                        xObject = page['/Resources']['/XObject'].get_object()
-                        for obj in xObject:
-                            if xObject[obj]['/Subtype'] == '/Image':
-                                return True
+                    image_xrefs.update(xref for xref, *_ in doc.get_page_images(page_num, full=False))
                 except Exception:
                     continue
-        return False
-    except (PyPDF2.errors.PdfReadError, PermissionError, OSError) as e:
+            return len(image_xrefs)
+    except (pymupdf.FileDataError, PermissionError, OSError) as e:
         print(f"  → PDFファイル読み込みエラー: {str(e)}")
-        return False
+        return None
     except Exception:
-        return False
+        return None
 
-def extract_images_from_pdf(file_path):
+def _open_pdf_image(doc, xref, image_filter):
     """
-    .pdfファイルから画像を抽出する
+    PDF内の画像XObjectをPILImageオブジェクトとして開く
+    
+    JPEG（/DCTDecode）は埋め込まれているバイト列のまま開き、展開は使う側で必要な解像度だけ行う。
+    それ以外はMuPDFで画素データに展開し、PNGへの再エンコードを挟まずにPillowへ渡す。
     
     Args:
-        file_path (str): .pdfファイルのパス
+        doc (pymupdf.Document): 対象PDFのドキュメント
+        xref (int): 画像XObjectのxref番号
+        image_filter (str): 画像ストリームのフィルタ名
         
     Returns:
-        list: 抽出された画像のPILImageオブジェクトのリスト
+        PILImageオブジェクト: 抽出された画像（データが空の場合はNone）
     """
-    images = []
+    if image_filter == 'DCTDecode':
+        image_info = doc.extract_image(xref)
+        if not image_info or len(image_info['image']) == 0:  # 空のデータをスキップ
+            return None
+        return Image.open(io.BytesIO(image_info['image']))
+    
+    # 色空間・フィルタ・プレディクタの復元はMuPDF側で行われる
+    pixmap = pymupdf.Pixmap(doc, xref)
+    if pixmap.width == 0 or pixmap.height == 0:
+        return None
+    # グレースケール・RGB以外（CMYK等）はRGBに変換する
+    if pixmap.n - pixmap.alpha not in (1, 3):
+        pixmap = pymupdf.Pixmap(pymupdf.csRGB, pixmap)
+    mode = {1: 'L', 2: 'LA', 3: 'RGB', 4: 'RGBA'}[pixmap.n]
+    return Image.frombytes(mode, (pixmap.width, pixmap.height), pixmap.samples_mv)
+
+def iter_pdf_images(file_path):
+    """
+    .pdfファイルから画像を1枚ずつ抽出する（ページ順に必要な分だけ読み込む）
+    
+    Args:
+        file_path (str): .pdfファイルのパス
+        
+    Yields:
+        PILImageオブジェクト: 抽出された画像
+    """
+    image_count = 0
+    completed = False
     try:
         # ファイルの存在とアクセス権限をチェック
         if not os.path.exists(file_path) or not os.access(file_path, os.R_OK):
-            return images
+            return
             
-        import PyPDF2
-        with open(file_path, 'rb') as pdf_file:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+        with pymupdf.open(file_path) as doc:
+            # 暗号化されたPDFの場合は空のパスワードで試行
+            if doc.needs_pass and not doc.authenticate(''):
+                print(f"  → 暗号化されたPDFをスキップ: {file_path}")
+                return
             
-            # 暗号化されたPDFの場合
-            if pdf_reader.is_encrypted:
+            # 複数ページで共有されている画像は最初の1回だけ抽出する
+            seen_xrefs = set()
+            for page_num in range(doc.page_count):
                 try:
-                    pdf_reader.decrypt('')  # 空のパスワードで試行
-                except:
-                    print(f"  → 暗号化されたPDFをスキップ: {file_path}")
-                    return images
-            
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    if '/Resources' in page and '/XObject' in page['/Resources']:
-                        xObject = page['/Resources']['/XObject'].get_object()
-                        for obj in xObject:
-                            if xObject[obj]['/Subtype'] == '/Image':
-                                try:
-                                    # 画像データを抽出
-                                    img_obj = xObject[obj]
-                                    if '/Filter' in img_obj:
-                                        if img_obj['/Filter'] == '/DCTDecode':
-                                            # JPEG画像
-                                            img_data = img_obj._data
-                                            if len(img_data) > 0:  # 空のデータをスキップ
-                                                image = Image.open(io.BytesIO(img_data))
-                                                if image.mode in ('RGBA', 'LA', 'P'):
-                                                    image = image.convert('RGB')
-                                                images.append(image)
-                                        elif img_obj['/Filter'] == '/FlateDecode':
-                                            # PNG/その他の圧縮画像
-                                            try:
-                                                width = int(img_obj['/Width'])
-                                                height = int(img_obj['/Height'])
-                                                img_data = img_obj._data
-                                                if len(img_data) > 0 and '/ColorSpace' in img_obj:
-                                                    if img_obj['/ColorSpace'] == '/DeviceRGB':
-                                                        expected_size = width * height * 3
-                                                        if len(img_data) >= expected_size:
-                                                            image = Image.frombytes('RGB', (width, height), img_data[:expected_size])
-                                                            images.append(image)
-                                            except (ValueError, TypeError):
-                                                continue
-                                except (Image.UnidentifiedImageError, OSError, ValueError) as e:
-                                    print(f"    → PDF画像抽出エラー (page {page_num + 1}): {str(e)}")
-                                    continue
-                                except Exception:
-                                    continue
+                    page_images = doc.get_page_images(page_num, full=True)
                 except Exception:
                     continue
-    except (PyPDF2.errors.PdfReadError, PermissionError, OSError) as e:
+                
+                for xref, smask, width, height, bpc, colorspace, alt_colorspace, name, image_filter, *_ in page_images:
+                    if xref in seen_xrefs:
+                        continue
+                    seen_xrefs.add(xref)
+                    
+                    try:
+                        image = _open_pdf_image(doc, xref, image_filter)
+                        if image is None:
+                            continue
+                        image_count += 1
+                        yield image
+                    except (Image.UnidentifiedImageError, OSError, ValueError, RuntimeError) as e:
+                        print(f"    → PDF画像抽出エラー (page {page_num + 1}): {str(e)}")
+                        continue
+                    except Exception:
+                        continue
+            
+            completed = True
+    except (pymupdf.FileDataError, PermissionError, OSError) as e:
         print(f"  → PDFファイル処理エラー: {str(e)}")
     except Exception:
         pass
-    return images
+    
+    # 最後まで読み込めた場合は画像数を記録し、以降の件数確認で再解析しないようにする
+    # （途中で失敗した場合の件数は不完全なため記録しない）
+    if completed:
+        cache_entry = _get_scan_cache_entry(file_path)
+        if cache_entry is not None:
+            cache_entry[4] = image_count
 
-def extract_docx_structure(file_path, output_base_dir="extracted_structures"):
+def count_pdf_images(file_path):
     """
-    .docxファイルの内部構造を指定されたディレクトリに展開する
+    .pdfファイルから抽出できる画像の数を取得する（数えた後に更新されていないファイルは再解析しない）
+    
+    Args:
+        file_path (str): .pdfファイルのパス
+        
+    Returns:
+        int: 抽出できる画像の数
+    """
+    # 調査済みで更新されていないファイルはキャッシュの結果を使う
+    cache_entry = _get_scan_cache_entry(file_path)
+    if cache_entry is not None and cache_entry[4] is not None:
+        return cache_entry[4]
+    
+    # 画像を溜め込まずに1枚ずつ数える
+    image_count = 0
+    for image in iter_pdf_images(file_path):
+        image.close()
+        image_count += 1
+    return image_count
+
+def _probe_image_count(file_path):
+    """
+    列数を決めるために、ファイルに含まれる画像の数を見積もる（スレッドプールで実行される）
+    
+    .pdfで抽出済みの画像数が分からない場合は、画像の有無のチェック時に数えた参照数で代用する
+    
+    Args:
+        file_path (str): ファイルパス
+        
+    Returns:
+        int: 画像の数
+    """
+    try:
+        file_kind = get_file_kind(file_path)
+        if file_kind == 'DOCX':
+            return len(get_media_filenames(file_path))
+        elif file_kind == 'PDF':
+            cache_entry = _get_scan_cache_entry(file_path)
+            if cache_entry is not None:
+                if cache_entry[4] is not None:
+                    return cache_entry[4]
+                if cache_entry[5] is not None:
+                    return cache_entry[5]
+            image_refs = scan_pdf_images(file_path)
+            if cache_entry is not None and image_refs is not None:
+                cache_entry[5] = image_refs
+            return image_refs or 0
+    except Exception:
+        pass
+    return 0
+
+def count_file_images(file_path):
+    """
+    ファイルに含まれる画像の数を取得する（.docxは画像ファイル数、.pdfは抽出できる画像数）
+    
+    Args:
+        file_path (str): ファイルパス
+        
+    Returns:
+        int: 画像の数
+    """
+    file_kind = get_file_kind(file_path)
+    if file_kind == 'DOCX':
+        return len(get_media_filenames(file_path))
+    elif file_kind == 'PDF':
+        return count_pdf_images(file_path)
+    return 0
+
+def _is_safe_member_name(name):
+    """
+    zip内のエントリ名が展開先ディレクトリの外を指していないかチェックする
+    
+    Args:
+        name (str): zip内のエントリ名
+        
+    Returns:
+        bool: そのまま展開先のパスとして使える場合True
+    """
+    if name.startswith(('/', '\\')) or ':' in name:
+        return False
+    return not any(part in ('', '.', '..') for part in name.rstrip('/').split('/'))
+
+def _member_timestamp(file_info):
+    """
+    zip内のエントリの更新日時をタイムスタンプにする
+    
+    Args:
+        file_info (zipfile.ZipInfo): zip内のエントリ情報
+        
+    Returns:
+        int: 更新日時のタイムスタンプ（秒）
+    """
+    return int(time.mktime(file_info.date_time + (0, 0, -1)))
+
+def _stamp_member_time(target_path, file_info):
+    """
+    展開したファイルの更新日時をzip内のエントリの更新日時に合わせる
+    
+    次回の差分更新では、サイズと更新日時が一致するファイルを読まずに済ませる
+    
+    Args:
+        target_path (str): 展開したファイルのパス
+        file_info (zipfile.ZipInfo): zip内のエントリ情報
+    """
+    timestamp = _member_timestamp(file_info)
+    os.utime(target_path, (timestamp, timestamp))
+
+def _file_matches_member(target_path, file_info):
+    """
+    展開済みのファイルがzip内のエントリと同じ内容かを確認する
+    
+    サイズが違えば読まずに別物とし、サイズと更新日時が一致すれば読まずに同じとみなす
+    CRCはサイズが同じで更新日時では判断できない場合にだけ計算する
+    
+    Args:
+        target_path (str): 展開済みのファイルのパス
+        file_info (zipfile.ZipInfo): zip内のエントリ情報
+        
+    Returns:
+        bool: 同じ内容の場合True
+    """
+    try:
+        stat = os.stat(target_path)
+        if stat.st_size != file_info.file_size:
+            return False
+        if int(stat.st_mtime) == _member_timestamp(file_info):
+            return True
+        
+        crc = 0
+        with open(target_path, 'rb') as target_file:
+            while True:
+                chunk = target_file.read(1024 * 1024)
+                if not chunk:
+                    break
+                crc = zlib.crc32(chunk, crc)
+        if crc != file_info.CRC:
+            return False
+        
+        # 内容が同じことを確認できたファイルは、次回からCRCを計算せずに済むよう日時を合わせる
+        _stamp_member_time(target_path, file_info)
+        return True
+    except (OSError, ValueError, OverflowError):
+        return False
+
+def _sync_docx_structure(zip_file, extract_dir):
+    """
+    展開済みのディレクトリを、内容が変わったエントリだけ書き直してzipと同じ状態にする
+    
+    Args:
+        zip_file (zipfile.ZipFile): 開いている.docxファイル
+        extract_dir (str): 展開先ディレクトリ
+        
+    Returns:
+        bool: 差分で更新できた場合True（エントリ名に問題があり全体の展開が必要な場合False）
+    """
+    file_infos = zip_file.infolist()
+    if not all(_is_safe_member_name(file_info.filename) for file_info in file_infos):
+        return False
+    
+    extract_dir = os.path.normpath(extract_dir)
+    expected_files = set()
+    # 展開先と、zipにディレクトリとして含まれるものは空でも残す
+    expected_dirs = {extract_dir}
+    for file_info in file_infos:
+        target_path = os.path.normpath(os.path.join(extract_dir, file_info.filename))
+        if file_info.filename.endswith('/'):
+            expected_dirs.add(target_path)
+            continue
+        expected_files.add(target_path)
+        # 画像の差し替え等で書き換えられたファイルだけを展開し直す
+        if not _file_matches_member(target_path, file_info):
+            _stamp_member_time(zip_file.extract(file_info, extract_dir), file_info)
+    
+    # zipに含まれないファイル（前回の展開後に追加されたもの）は削除し、空になったディレクトリも消す
+    # （下の階層から辿るため、子ディレクトリを消した後で親が空かどうかを判定できる）
+    for root, dirs, files in os.walk(extract_dir, topdown=False):
+        root = os.path.normpath(root)
+        for name in files:
+            path = os.path.join(root, name)
+            if path not in expected_files:
+                os.remove(path)
+        if root not in expected_dirs and not os.listdir(root):
+            os.rmdir(root)
+    return True
+
+def _extract_docx_structure(file_path, output_base_dir):
+    """
+    .docxファイルの内部構造を展開し、表示用のメッセージと共に返す（スレッドから呼び出せるよう出力はしない）
     
     Args:
         file_path (str): .docxファイルのパス
         output_base_dir (str): 展開先のベースディレクトリ
         
     Returns:
-        str: 展開されたディレクトリのパス（失敗時はNone）
+        tuple: (展開されたディレクトリのパス（失敗時はNone）, 表示用のメッセージ)
     """
     try:
         # ファイルの存在とアクセス権限をチェック
         if not os.path.exists(file_path) or not os.access(file_path, os.R_OK):
-            return None
+            return None, None
             
         # 出力ディレクトリを作成
         os.makedirs(output_base_dir, exist_ok=True)
         
         # ファイル名から展開先ディレクトリ名を作成
-        base_name = os.path.splitext(os.path.basename(file_path))[0]
         # 相対パスの情報も含める（安全な文字に変換）
         relative_path = os.path.relpath(file_path, ".")
         safe_path = relative_path.replace("\\", "_").replace("/", "_").replace(":", "_")
@@ -319,58 +718,190 @@ def extract_docx_structure(file_path, output_base_dir="extracted_structures"):
         
         extract_dir = os.path.join(output_base_dir, safe_name)
         
-        # 既存のディレクトリが存在する場合は削除
-        if os.path.exists(extract_dir):
-            shutil.rmtree(extract_dir)
-        
-        # zipファイルとして展開
-        with zipfile.ZipFile(file_path, 'r') as zip_file:
+        # 全てのエントリを読むため、大きめのバッファで読み込みのシステムコールを減らす
+        with open(file_path, 'rb', buffering=ZIP_READ_BUFFER_SIZE) as docx_file, \
+                zipfile.ZipFile(docx_file, 'r') as zip_file:
+            # 既存のディレクトリがある場合は、変わったファイルだけを書き直す
+            if os.path.isdir(extract_dir) and _sync_docx_structure(zip_file, extract_dir):
+                return extract_dir, f"  → 内部構造を展開: {extract_dir}"
+            
+            # 既存のディレクトリが存在する場合は削除
+            if os.path.exists(extract_dir):
+                shutil.rmtree(extract_dir)
+            
+            # zipファイルとして展開
             zip_file.extractall(extract_dir)
+            
+            # 次回の差分更新でファイルを読まずに比較できるよう、更新日時をエントリに合わせる
+            for file_info in zip_file.infolist():
+                if not file_info.filename.endswith('/') and _is_safe_member_name(file_info.filename):
+                    _stamp_member_time(os.path.join(extract_dir, file_info.filename), file_info)
         
-        print(f"  → 内部構造を展開: {extract_dir}")
-        return extract_dir
+        return extract_dir, f"  → 内部構造を展開: {extract_dir}"
         
     except (zipfile.BadZipFile, PermissionError, OSError) as e:
-        print(f"  → docx展開エラー: {str(e)}")
-        return None
+        return None, f"  → docx展開エラー: {str(e)}"
     except Exception as e:
-        print(f"  → 予期しないエラー: {str(e)}")
-        return None
+        return None, f"  → 予期しないエラー: {str(e)}"
+
+def extract_docx_structure(file_path, output_base_dir="extracted_structures"):
+    """
+    .docxファイルの内部構造を指定されたディレクトリに展開する
+    （展開済みの場合は、内容が変わったファイルだけを書き直す）
+    
+    Args:
+        file_path (str): .docxファイルのパス
+        output_base_dir (str): 展開先のベースディレクトリ
+        
+    Returns:
+        str: 展開されたディレクトリのパス（失敗時はNone）
+    """
+    extract_dir, message = _extract_docx_structure(file_path, output_base_dir)
+    if message:
+        print(message)
+    return extract_dir
 
-def filter_files_with_images(file_list):
+def _prefetch_file_tails(file_list):
+    """
+    画像チェックで最初に読まれるファイル末尾の先読みを、まとめてカーネルに依頼する
+    （読み込み完了は待たないため、ディスクの待ち時間が複数ファイル分まとめて重なる）
+    
+    Args:
+        file_list (list): ファイルパスのリスト
+    """
+    if not _HAS_FADVISE:
+        return
+    for file_path in file_list:
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            file_size = os.fstat(fd).st_size
+            os.posix_fadvise(fd, max(0, file_size - PREFETCH_TAIL_SIZE), 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+def _file_has_images(file_path):
+    """
+    ファイルの種類に応じて画像の有無をチェックする（ワーカープロセス用）
+    
+    Args:
+        file_path (str): .docx または .pdf ファイルのパス
+        
+    Returns:
+        tuple: (画像が含まれている場合True, チェック中に出力されたメッセージ,
+                調査結果（.docxは画像ファイル名のリスト、.pdfは画像の参照数。読み込めなかった場合はNone）)
+    """
+    # ワーカー同士で標準出力を取り合わないよう、メッセージは戻り値で返す
+    output = io.StringIO()
+    scan_result = None
+    with contextlib.redirect_stdout(output):
+        try:
+            file_kind = get_file_kind(file_path)
+            if file_kind == 'DOCX':
+                # 画像の有無と画像ファイル名を1回のzip読み込みで取得する
+                scan_result = scan_docx_media(file_path)
+                result = bool(scan_result)
+            elif file_kind == 'PDF':
+                # 画像の有無と画像の参照数を1回のPDF読み込みで取得する
+                scan_result = scan_pdf_images(file_path)
+                result = bool(scan_result)
+            else:
+                result = False
+        except Exception as e:
+            print(f"  → ファイルチェックエラー: {str(e)}")
+            result = False
+    return result, output.getvalue(), scan_result
+
+def filter_files_with_images(file_list, extract_structure=False, verbose=None):
     """
     ファイルリストから画像が含まれているファイルのみを抽出する
     
     Args:
         file_list (list): ファイルパスのリスト
+        extract_structure (bool): 画像を含む.docxの内部構造を extracted_structures に展開する場合True
+        verbose (bool): ファイルごとのチェック結果も表示するか（Noneの場合は標準出力が端末の時のみ表示）
         
     Returns:
         list: 画像が含まれているファイルのリスト
     """
+    if verbose is None:
+        verbose = sys.stdout.isatty()
+    
     files_with_images = []
+    # ファイルごとの出力は溜めておき、まとめて書き出す（エラーは詳細表示でなくても表示する）
+    log = []
     
-    for file_path in file_list:
+    # 前回から更新されていないファイルはキャッシュの結果を使い、残りだけを調査する
+    cache_entries = [_get_scan_cache_entry(file_path) for file_path in file_list]
+    pending_files = [file_path for file_path, cache_entry in zip(file_list, cache_entries)
+                     if cache_entry is None or cache_entry[2] is None]
+    
+    # 画像の有無は複数プロセスで並列にチェックし、結果は元の順序で受け取る
+    checked = {}
+    if pending_files:
+        _prefetch_file_tails(pending_files)
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            checked = dict(zip(pending_files, executor.map(_file_has_images, pending_files, chunksize=8)))
+    
+    # 内部構造の展開はスレッドで並列に行い、チェックの表示を待たせない
+    # （展開結果のメッセージは最後にまとめて元の順序で表示する）
+    structure_executor = ThreadPoolExecutor(max_workers=STRUCTURE_THREADS) if extract_structure else None
+    structure_futures = []
+    
+    for file_path, cache_entry in zip(file_list, cache_entries):
         try:
-            print(f"チェック中: {file_path}")
+            output = None
+            if file_path in checked:
+                has_images, output, scan_result = checked[file_path]
+                if cache_entry is not None:
+                    cache_entry[2] = has_images
+                    # 画像ファイル名・画像の参照数も記録し、Excel・CSV作成時に開き直さないようにする
+                    if scan_result is not None:
+                        if get_file_kind(file_path) == 'DOCX':
+                            cache_entry[3] = scan_result
+                        else:
+                            cache_entry[5] = scan_result
+            else:
+                has_images = cache_entry[2]
             
-            if file_path.endswith('.docx'):
-                if has_images_in_docx(file_path):
-                    files_with_images.append(file_path)
-                    print(f"  → 画像あり")
-                    # Word文書の内部構造を展開
-                    extract_docx_structure(file_path)
-                else:
-                    print(f"  → 画像なし")
-                    
-            elif file_path.endswith('.pdf'):
-                if has_images_in_pdf(file_path):
-                    files_with_images.append(file_path)
-                    print(f"  → 画像あり")
-                else:
-                    print(f"  → 画像なし")
+            if verbose or output:
+                log.append(f"チェック中: {file_path}")
+            if output:
+                log.append(output.rstrip('\n'))
+            
+            if has_images:
+                files_with_images.append(file_path)
+                if verbose:
+                    log.append(f"  → 画像あり")
+                # Word文書の内部構造を展開
+                if structure_executor is not None and get_file_kind(file_path) == 'DOCX':
+                    structure_futures.append(
+                        structure_executor.submit(_extract_docx_structure, file_path, "extracted_structures"))
+            elif verbose:
+                log.append(f"  → 画像なし")
         except Exception as e:
-            print(f"  → ファイルチェックエラー: {str(e)}")
+            log.append(f"チェック中: {file_path}")
+            log.append(f"  → ファイルチェックエラー: {str(e)}")
             continue
+    _flush_log(log)
+    
+    if structure_executor is not None:
+        if structure_futures:
+            print("内部構造の展開を待機中...")
+        for future in structure_futures:
+            try:
+                extract_dir, message = future.result()
+            except Exception as e:
+                extract_dir, message = None, f"  → 予期しないエラー: {str(e)}"
+            # 展開できたファイルの行は詳細表示時のみ出力する
+            if message and (verbose or extract_dir is None):
+                log.append(message)
+        _flush_log(log)
+        structure_executor.shutdown()
     
     return files_with_images
 
@@ -378,19 +909,32 @@ def resize_image_to_100px(image):
     """
     画像を100px×100pxにリサイズする（アスペクト比を保持）
     
+    thumbnailはその場で縮小するため、渡した画像そのものが書き換えられる。
+    元の画像を残す必要がある場合は、呼び出し側でcopy()してから渡すこと。
+    
     Args:
-        image: PILImageオブジェクト
+        image: PILImageオブジェクト（この関数で書き換えられる）
         
     Returns:
-        PILImageオブジェクト: リサイズされた画像
+        PILImageオブジェクト: リサイズされた画像（パレット画像を変換した場合以外は引数と同じオブジェクト）
     """
     try:
         # 画像のサイズをチェック
         if image.size[0] == 0 or image.size[1] == 0:
             raise ValueError("無効な画像サイズ")
         
+        # 既に100px以内の画像（アイコン等）は縮小不要なのでそのまま返す
+        max_side = max(image.size)
+        if max_side <= 100:
+            return image
+        
+        # パレット画像は直接RGBに変換してから縮小する（パレットのままだと縮小が遅い）
+        if image.mode == 'P':
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        
         # アスペクト比を保持して100px以内にリサイズ
-        image.thumbnail((100, 100), Image.Resampling.LANCZOS)
+        # （100pxのプレビューではLANCZOSとの差は見えないため、軽いBILINEARを使う）
+        image.thumbnail((100, 100), Image.Resampling.BILINEAR)
         return image
     except Exception as e:
         print(f"    → 画像リサイズエラー: {str(e)}")
@@ -398,170 +942,362 @@ def resize_image_to_100px(image):
         fallback_image = Image.new('RGB', (50, 50), 'white')
         return fallback_image
 
-def save_to_excel_with_images(file_list, output_dir="result", output_filename="検索結果.xlsx"):
+def _prepare_image_buffer(image):
     """
-    ファイルリストと画像をExcelファイルに保存する（各ファイルごとに2行使用：上段に画像ファイル名、下段にファイルパスと画像）
+    画像を100px×100pxに縮小し、メモリ上のPNGデータに変換する（ワーカープロセス内のスレッドで実行される）
+    
+    Args:
+        image: PILImageオブジェクト（変換後に閉じる）
+        
+    Returns:
+        io.BytesIO: PNGデータ（先頭にシーク済み）
+    """
+    try:
+        # JPEGは展開前に縮小デコードを指定し、100px程度の解像度だけ展開する
+        # （展開済みの画像やJPEG以外では何もしない）
+        image.draft(None, (100, 100))
+        
+        # 画像を100px×100pxにリサイズ
+        # （画像はここでしか使わないため、コピーせずにその場で縮小する）
+        resized_image = resize_image_to_100px(image)
+        
+        # RGB・グレースケール以外は縮小後の小さい画像でRGBに変換する
+        if resized_image.mode not in ('RGB', 'L'):
+            rgb_image = resized_image.convert('RGB')
+            resized_image.close()
+            resized_image = rgb_image
+        
+        # 一時ファイルを使わずメモリ上でPNGに変換
+        # （バッファはExcel保存時に読み込まれるため閉じずに渡す）
+        image_buffer = io.BytesIO()
+        resized_image.save(image_buffer, 'PNG', compress_level=1)
+        resized_image.close()
+        image_buffer.seek(0)
+        return image_buffer
+    finally:
+        # 元画像の画素データをすぐに解放する
+        image.close()
+
+def _prepare_file_images(file_path):
+    """
+    1ファイル分の画像を抽出し、100px×100pxのPNGデータにする（ワーカープロセス用）
+    
+    PIL画像はプロセス間で受け渡さず、PNGのバイト列で返す
+    
+    Args:
+        file_path (str): .docx または .pdf ファイルのパス
+        
+    Returns:
+        tuple: (画像ファイル名のリスト, 画像ごとの(PNGバイト列, エラーメッセージ)のリスト,
+                抽出中に出力されたメッセージ, ファイル全体のエラーメッセージ（なければNone）)
+    """
+    image_filenames = []
+    image_results = []
+    file_error = None
+    
+    # ワーカー同士で標準出力を取り合わないよう、メッセージは戻り値で返す
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            # 画像は1枚ずつ取り出し、縮小・変換が済んだものから順に解放する
+            file_kind = get_file_kind(file_path)
+            if file_kind == 'DOCX':
+                # ファイル名と画像を1回のzip走査でまとめて取得
+                image_items = ((filename, _open_docx_image(filename, image_stream, (100, 100)))
+                               for filename, image_stream in iter_docx_media(file_path))
+            elif file_kind == 'PDF':
+                image_items = ((f"pdf_image{i+1}", image)
+                               for i, image in enumerate(iter_pdf_images(file_path)))
+            else:
+                image_items = ()
+            
+            # 画像の変換をスレッドに渡す（変換待ちの画像はスレッド数の2倍までに抑える）
+            with ThreadPoolExecutor(max_workers=IMAGE_THREADS) as executor:
+                futures = []
+                for image_filename, image in image_items:
+                    image_filenames.append(image_filename)
+                    futures.append(executor.submit(_prepare_image_buffer, image))
+                    if len(futures) > IMAGE_THREADS * 2:
+                        wait([futures[-IMAGE_THREADS * 2 - 1]])
+                
+                for future in futures:
+                    try:
+                        image_results.append((future.result().getvalue(), None))
+                    except OSError as e:
+                        image_results.append((None, f"画像変換エラー ({str(e)})"))
+                    except Exception as e:
+                        image_results.append((None, f"画像処理エラー ({str(e)})"))
+        except Exception as e:
+            file_error = str(e)
+    
+    return image_filenames, image_results, output.getvalue(), file_error
+
+def _iter_prepared_images(executor, file_list):
+    """
+    ワーカープロセスに画像の準備を依頼し、結果をファイルの順序どおりに返す
+    （先行して準備するファイルはワーカー数の2倍までに抑える）
+    
+    Args:
+        executor (ProcessPoolExecutor): 画像を準備するワーカープロセス
+        file_list (list): ファイルパスのリスト
+        
+    Yields:
+        tuple: (ファイルパス, _prepare_file_images の戻り値)
+    """
+    pending = deque()
+    for file_path in file_list:
+        pending.append((file_path, executor.submit(_prepare_file_images, file_path)))
+        if len(pending) > MAX_WORKERS * 2:
+            yield _take_prepared_images(*pending.popleft())
+    while pending:
+        yield _take_prepared_images(*pending.popleft())
+
+def _take_prepared_images(file_path, future):
+    """
+    ワーカープロセスの準備結果を受け取る（ワーカーが異常終了した場合はファイルのエラーとして返す）
+    
+    Args:
+        file_path (str): ファイルパス
+        future (Future): _prepare_file_images の実行結果
+        
+    Returns:
+        tuple: (ファイルパス, _prepare_file_images の戻り値)
+    """
+    try:
+        return file_path, future.result()
+    except Exception as e:
+        return file_path, ([], [], '', str(e))
+
+def _make_csv_row(file_path, image_filenames, max_images):
+    """
+    CSVの1行分のデータを列数に合わせた長さのリストとして作成する
+    
+    Args:
+        file_path (str): ファイルパス
+        image_filenames (list): 画像ファイル名のリスト
+        max_images (int): 画像ファイル名の列数
+        
+    Returns:
+        list: ファイルパスと画像ファイル名（足りない列は空文字で埋める）
+    """
+    row = [file_path] + list(image_filenames[:max_images])
+    row.extend([''] * (max_images + 1 - len(row)))
+    return row
+
+def _open_csv_writer(stack, csv_path, header):
+    """
+    CSVファイルを開いてヘッダーを書き出し、1行ずつ書き込めるライターを返す
+    
+    Args:
+        stack (contextlib.ExitStack): ファイルを閉じる処理を登録するExitStack
+        csv_path (str): 出力するCSVファイルのパス
+        header (list): 列名のリスト
+        
+    Returns:
+        csv.writer: CSVライター（開けなかった場合はNone）
+    """
+    try:
+        csv_file = stack.enter_context(open(csv_path, 'w', encoding='utf-8-sig', newline=''))
+        writer = csv.writer(csv_file, lineterminator=os.linesep)
+        writer.writerow(header)
+        return writer
+    except Exception as e:
+        print(f"CSVファイル保存エラー: {str(e)}")
+        return None
+
+def save_results(file_list, output_dir="result", excel_filename="検索結果.xlsx", csv_filename="検索結果.csv", verbose=None):
+    """
+    ファイルリストと画像をExcelファイルに、画像ファイル名をCSVファイルに保存する
+    （各ファイルは1回だけ読み込み、Excelの行とCSVの行を同時に書き出す）
+    
+    Excelは各ファイルごとに2行使用：上段に画像ファイル名、下段にファイルパスと画像
     
     Args:
         file_list (list): ファイルパスのリスト
         output_dir (str): 出力ディレクトリ
-        output_filename (str): 出力するExcelファイル名
+        excel_filename (str): 出力するExcelファイル名
+        csv_filename (str): 出力するCSVファイル名（Noneの場合はCSVを出力しない）
+        verbose (bool): 画像ごとの配置結果も表示するか（Noneの場合は標準出力が端末の時のみ表示）
     """
+    if verbose is None:
+        verbose = sys.stdout.isatty()
+    
     if not file_list:
         print("保存するファイルがありません。")
         return
     
     # 出力ディレクトリを作成
     os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, output_filename)
+    output_path = os.path.join(output_dir, excel_filename)
     
-    # 新しいワークブックを作成
-    wb = Workbook()
-    ws = wb.active
+    # 新しいワークブックを作成（行を書き出した順にストリーム出力し、メモリに保持しない）
+    # （lxmlがインストールされていれば、openpyxlはlxmlでXMLを書き出す）
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
     
     # 全ファイルの最大画像数を調査してヘッダーを決定
-    max_images = 0
+    # （ファイルの読み込みが重なるよう複数スレッドで調べる。PDFの画像はここでは展開しない）
     print("各ファイルの画像数を調査中...")
-    for file_path in file_list:
-        try:
-            if file_path.endswith('.docx'):
-                media_filenames = get_media_filenames(file_path)
-                max_images = max(max_images, len(media_filenames))
-            elif file_path.endswith('.pdf'):
-                images = extract_images_from_pdf(file_path)
-                max_images = max(max_images, len(images))
-        except Exception:
-            continue
+    with ThreadPoolExecutor(max_workers=PROBE_THREADS) as executor:
+        max_images = max(executor.map(_probe_image_count, file_list), default=0)
     
     print(f"最大画像数: {max_images}")
     
-    # ヘッダーを設定
-    ws['A1'] = 'ファイルパス'
-    # B列以降のヘッダーは空白にする（image1, image2などは不要）
-    for i in range(max_images):
-        col_letter = chr(ord('B') + i) if i < 25 else f"A{chr(ord('A') + i - 25)}"
-        ws[f'{col_letter}1'] = ''  # 空白に変更
+    # 書き込み専用モードでは行の追加前にシートの書式を決めておく
+    # 行の高さは画像行（75）をシートの既定値とし、ヘッダー行とファイル名行だけ個別に指定する
+    ws.sheet_format.defaultRowHeight = 75
+    ws.sheet_format.customHeight = True
+    ws.row_dimensions[1].height = 15
+    # ファイル名行は全て同じ高さなので、行の情報を1つだけ作って使い回す
+    # （書き込み専用モードでは行の情報は出力時に属性として読まれるだけで、行番号は持たない）
+    filename_row_dimension = RowDimension(ws, ht=20)  # ファイル名行は低め
     
     # 列の幅を設定
     ws.column_dimensions['A'].width = 70
-    for i in range(max_images):
-        col_letter = chr(ord('B') + i) if i < 25 else f"A{chr(ord('A') + i - 25)}"
-        ws.column_dimensions[col_letter].width = 15
+    if max_images > 0:
+        # 画像列はB列から連続しているため、1つの列範囲としてまとめて指定する
+        image_columns = ws.column_dimensions['B']
+        image_columns.width = 15
+        image_columns.min = 2
+        image_columns.max = max_images + 1
     
-    temp_files = []  # 一時ファイルのリストを保持
+    # ヘッダーを設定
+    # B列以降のヘッダーは空白にする（image1, image2などは不要）
+    ws.append(['ファイルパス'] + [''] * max_images)
     
-    try:
-        current_row = 2  # ヘッダーの次の行から開始
+    # CSVの列（ファイルパスと最大画像数分の画像ファイル名）
+    header = ['ファイルパス'] + [f'画像{i+1}_ファイル名' for i in range(max_images)]
+    
+    current_row = 2  # ヘッダーの次の行から開始
+    
+    # 画像の展開・縮小・PNG変換はワーカープロセスで先行して行い、
+    # Excel・CSVへの書き込みはメインプロセスで届いた順（ファイルの順序）に行う
+    with contextlib.ExitStack() as stack:
+        executor = stack.enter_context(ProcessPoolExecutor(max_workers=MAX_WORKERS))
+        csv_writer = None
+        if csv_filename:
+            csv_path = os.path.join(output_dir, csv_filename)
+            csv_writer = _open_csv_writer(stack, csv_path, header)
         
-        for file_path in file_list:
-            try:
-                print(f"画像抽出中: {file_path}")
-                
-                # 画像を抽出
-                images = []
-                image_filenames = []
-                
-                if file_path.endswith('.docx'):
-                    images = extract_images_from_docx(file_path)
-                    image_filenames = get_media_filenames(file_path)
-                elif file_path.endswith('.pdf'):
-                    images = extract_images_from_pdf(file_path)
-                    image_filenames = [f"pdf_image{i+1}" for i in range(len(images))]
-                
-                # 上段の行（画像ファイル名行）
-                filename_row = current_row
-                # 下段の行（ファイルパスと画像行）
-                image_row = current_row + 1
-                
-                # 行の高さを設定
-                ws.row_dimensions[filename_row].height = 20  # ファイル名行は低め
-                ws.row_dimensions[image_row].height = 75     # 画像行は高め
-                
-                # 下段にファイルパスを設定
-                ws[f'A{image_row}'] = file_path
-                
-                # 各画像を処理
-                for img_idx, image in enumerate(images):
-                    try:
-                        col_letter = chr(ord('B') + img_idx) if img_idx < 25 else f"A{chr(ord('A') + img_idx - 25)}"
-                        
-                        # 上段に画像ファイル名を設定
-                        filename_cell = f'{col_letter}{filename_row}'
-                        if img_idx < len(image_filenames):
-                            ws[filename_cell] = image_filenames[img_idx]
-                        else:
-                            ws[filename_cell] = f"image{img_idx+1}"
-                        
-                        # 下段に画像を配置
-                        image_cell = f'{col_letter}{image_row}'
-                        
-                        # 画像を100px×100pxにリサイズ
-                        resized_image = resize_image_to_100px(image.copy())
-                        
-                        # 一時ファイルを作成（手動で削除）
-                        temp_fd, temp_path = tempfile.mkstemp(suffix='.png')
-                        temp_files.append(temp_path)  # 削除用にリストに追加
-                        
-                        try:
-                            # ファイルディスクリプタを閉じる
-                            os.close(temp_fd)
-                            
-                            # 画像を保存
-                            resized_image.save(temp_path, 'PNG', optimize=True)
-                            
-                            # ファイルサイズをチェック（異常に大きい場合はスキップ）
-                            if os.path.getsize(temp_path) > 10 * 1024 * 1024:  # 10MB制限
-                                print(f"    → {img_idx+1}番目の画像: ファイルサイズが大きすぎます")
-                                continue
-                            
-                            # Excelに画像を挿入
-                            img = OpenpyxlImage(temp_path)
-                            img.width = 100
-                            img.height = 100
-                            
-                            ws.add_image(img, image_cell)
-                            
-                            filename = image_filenames[img_idx] if img_idx < len(image_filenames) else f"image{img_idx+1}"
-                            print(f"  → {filename}: {col_letter}列に配置完了（ファイル名: {filename_row}行目、画像: {image_row}行目）")
-                        except (OSError, PermissionError) as e:
-                            print(f"  → {img_idx+1}番目の画像: ファイル操作エラー ({str(e)})")
-                        except Exception as e:
-                            print(f"  → {img_idx+1}番目の画像: エラー ({str(e)})")
-                    except Exception as e:
-                        print(f"  → {img_idx+1}番目の画像: 画像処理エラー ({str(e)})")
+        for file_path, prepared in _iter_prepared_images(executor, file_list):
+            image_filenames, image_results, output, file_error = prepared
+            
+            # 上段の行（画像ファイル名行）
+            filename_row = current_row
+            # 下段の行（ファイルパスと画像行）
+            image_row = current_row + 1
+            
+            placed_images = []
+            # 画像ごとの出力は溜めておき、ファイルごとにまとめて書き出す
+            log = [f"画像抽出中: {file_path}"]
+            if output:
+                log.append(output.rstrip('\n'))
+            
+            # 各画像を元の順序で配置
+            for img_idx, (image_filename, (png_data, image_error)) in enumerate(zip(image_filenames, image_results)):
+                if image_error is not None:
+                    log.append(f"  → {img_idx+1}番目の画像: {image_error}")
+                    continue
                 
-                print(f"  → 合計 {len(images)} 個の画像を処理（{filename_row}-{image_row}行目）")
+                # B列から順に配置（Z列より先もAA, AB, ... と正しく続ける）
+                col_letter = get_column_letter(img_idx + 2)
                 
-                # 次のファイル用に行を2つ進める
-                current_row += 2
+                # 下段に画像を配置
+                image_cell = f'{col_letter}{image_row}'
                 
-            except Exception as e:
-                print(f"  → ファイル処理エラー: {str(e)}")
-                # エラーが発生してもカウンターは進める
-                current_row += 2
-                continue
-        
-        # Excelファイルを保存
-        try:
-            wb.save(output_path)
-            print(f"Excelファイルを保存しました: {output_path}")
-        except (PermissionError, OSError) as e:
-            print(f"Excelファイル保存エラー: {str(e)}")
-            # 代替ファイル名で保存を試行
-            import time
-            alt_filename = f"画像含有ファイル検索結果_{int(time.time())}.xlsx"
-            alt_path = os.path.join(output_dir, alt_filename)
-            wb.save(alt_path)
-            print(f"代替ファイル名で保存しました: {alt_path}")
+                try:
+                    # ファイルサイズをチェック（異常に大きい場合はスキップ）
+                    if len(png_data) > 10 * 1024 * 1024:  # 10MB制限
+                        log.append(f"    → {img_idx+1}番目の画像: ファイルサイズが大きすぎます")
+                        continue
+                    
+                    # Excelに画像を挿入（行の書き出し後にまとめて配置する）
+                    # （バッファはExcel保存時に読み込まれるため閉じずに渡す）
+                    img = OpenpyxlImage(io.BytesIO(png_data))
+                    img.width = 100
+                    img.height = 100
+                    
+                    placed_images.append((img, image_cell))
+                    
+                    if verbose:
+                        log.append(f"  → {image_filename}: {col_letter}列に配置完了（ファイル名: {filename_row}行目、画像: {image_row}行目）")
+                except OSError as e:
+                    log.append(f"  → {img_idx+1}番目の画像: 画像変換エラー ({str(e)})")
+                except Exception as e:
+                    log.append(f"  → {img_idx+1}番目の画像: 画像処理エラー ({str(e)})")
+            
+            if file_error is None:
+                log.append(f"  → 合計 {len(image_results)} 個の画像を処理（{filename_row}-{image_row}行目）")
+                # PDFの画像数を記録し、次回以降の列数の調査で再解析しないようにする
+                if get_file_kind(file_path) == 'PDF':
+                    cache_entry = _get_scan_cache_entry(file_path)
+                    if cache_entry is not None:
+                        cache_entry[4] = len(image_filenames)
+            else:
+                log.append(f"  → ファイル処理エラー: {file_error}")
+            _flush_log(log)
+            
+            # 書き込み専用モードでは行を上から順に追加する（エラーが発生しても2行分進める）
+            ws.row_dimensions[filename_row] = filename_row_dimension
+            ws.append([None] + image_filenames)
+            # 下段にファイルパスを設定
+            ws.append([file_path])
+            for img, image_cell in placed_images:
+                ws.add_image(img, image_cell)
+            
+            # CSVにはExcelと同じ画像ファイル名を書き出す（ファイルを読み直さない）
+            if csv_writer is not None:
+                csv_writer.writerow(_make_csv_row(file_path, image_filenames, max_images))
+            
+            # 次のファイル用に行を2つ進める
+            current_row += 2
     
-    finally:
-        # 一時ファイルをクリーンアップ
-        for temp_path in temp_files:
-            try:
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-            except Exception:
-                pass  # 削除できなくても続行
+    if csv_writer is not None:
+        print(f"CSVファイルを保存しました: {csv_path}")
+    
+    # Excelファイルを保存
+    try:
+        wb.save(output_path)
+        print(f"Excelファイルを保存しました: {output_path}")
+    except (PermissionError, OSError) as e:
+        print(f"Excelファイル保存エラー: {str(e)}")
+        # 代替ファイル名で保存を試行
+        import time
+        alt_filename = f"画像含有ファイル検索結果_{int(time.time())}.xlsx"
+        alt_path = os.path.join(output_dir, alt_filename)
+        wb.save(alt_path)
+        print(f"代替ファイル名で保存しました: {alt_path}")
+
+def save_to_excel_with_images(file_list, output_dir="result", output_filename="検索結果.xlsx", verbose=None):
+    """
+    ファイルリストと画像をExcelファイルに保存する（各ファイルごとに2行使用：上段に画像ファイル名、下段にファイルパスと画像）
+    
+    Args:
+        file_list (list): ファイルパスのリスト
+        output_dir (str): 出力ディレクトリ
+        output_filename (str): 出力するExcelファイル名
+        verbose (bool): 画像ごとの配置結果も表示するか（Noneの場合は標準出力が端末の時のみ表示）
+    """
+    save_results(file_list, output_dir, output_filename, csv_filename=None, verbose=verbose)
+
+def _get_csv_image_filenames(file_path):
+    """
+    CSVに記録する画像ファイル名のリストを取得する
+    
+    Args:
+        file_path (str): ファイルパス
+        
+    Returns:
+        list: 画像ファイル名のリスト（.pdfの場合は便宜的な名前）
+    """
+    file_kind = get_file_kind(file_path)
+    if file_kind == 'DOCX':
+        # 全ての画像ファイル名を記録
+        return get_media_filenames(file_path)
+    elif file_kind == 'PDF':
+        # PDFの場合は便宜的な名前を使用
+        return [f"pdf_image{i+1}" for i in range(count_pdf_images(file_path))]
+    return []
 
 def save_to_csv_with_image_info(file_list, output_dir="result", output_filename="検索結果.csv"):
     """
@@ -580,40 +1316,33 @@ def save_to_csv_with_image_info(file_list, output_dir="result", output_filename=
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, output_filename)
     
-    # CSVデータを準備
-    csv_data = []
-    
     print("CSV用データを作成中...")
+    
+    # 列数（最大画像数）を先に決める
+    # （画像ファイル名・PDFの画像数は調査済みの結果を使うため、ファイルを解析し直さない）
+    max_images = 0
     for file_path in file_list:
         try:
-            print(f"画像情報抽出中: {file_path}")
-            
-            row = {'ファイルパス': file_path}
-            
-            if file_path.endswith('.docx'):
-                media_filenames = get_media_filenames(file_path)
-                # 全ての画像ファイル名を記録
-                for i, filename in enumerate(media_filenames):
-                    row[f'画像{i+1}_ファイル名'] = filename
-                    
-            elif file_path.endswith('.pdf'):
-                images = extract_images_from_pdf(file_path)
-                # PDFの場合は便宜的な名前を使用
-                for i in range(len(images)):
-                    row[f'画像{i+1}_ファイル名'] = f"pdf_image{i+1}"
-            
-            csv_data.append(row)
-            
-        except Exception as e:
-            print(f"  → ファイル処理エラー: {str(e)}")
-            # エラーの場合もファイルパスは記録
-            csv_data.append({'ファイルパス': file_path})
+            max_images = max(max_images, count_file_images(file_path))
+        except Exception:
             continue
+    header = ['ファイルパス'] + [f'画像{i+1}_ファイル名' for i in range(max_images)]
     
-    # DataFrameを作成してCSV保存
+    # 1行ずつ書き出し、全行分のデータをメモリに溜めない
+    # （各行は列数分の長さのリストで作り、列名による詰め替えを省く）
     try:
-        df = pd.DataFrame(csv_data)
-        df.to_csv(output_path, index=False, encoding='utf-8-sig')
+        with open(output_path, 'w', encoding='utf-8-sig', newline='') as csv_file:
+            writer = csv.writer(csv_file, lineterminator=os.linesep)
+            writer.writerow(header)
+            for file_path in file_list:
+                try:
+                    print(f"画像情報抽出中: {file_path}")
+                    image_filenames = _get_csv_image_filenames(file_path)
+                except Exception as e:
+                    print(f"  → ファイル処理エラー: {str(e)}")
+                    # エラーの場合もファイルパスは記録
+                    image_filenames = []
+                writer.writerow(_make_csv_row(file_path, image_filenames, max_images))
         print(f"CSVファイルを保存しました: {output_path}")
     except Exception as e:
         print(f"CSVファイル保存エラー: {str(e)}")
@@ -625,6 +1354,9 @@ def main():
     print(f"ディレクトリをクロール中: {os.path.abspath(search_directory)}")
     print("-" * 50)
     
+    # 前回までの調査結果を読み込む（更新されていないファイルは再調査しない）
+    load_scan_cache()
+    
     # ファイルを抽出
     files = extract_docx_pdf_files(search_directory)
     
@@ -637,7 +1369,8 @@ def main():
         print("画像が含まれているファイルをチェック中...")
         print("-" * 50)
         
-        files_with_images = filter_files_with_images(files)
+        # （画像差し替え処理で使う内部構造も展開しておく）
+        files_with_images = filter_files_with_images(files, extract_structure=True)
         
         print("\n" + "-" * 50)
         print(f"画像が含まれているファイル数: {len(files_with_images)}")
@@ -645,22 +1378,20 @@ def main():
         for i, file_path in enumerate(files_with_images, 1):
             print(f"{i:3d}. {file_path}")
         
-        # Excelファイルに保存（実際の画像ファイル名でヘッダー作成）
+        # ExcelファイルとCSVファイルに保存（各ファイルを1回だけ読み込んで両方を作成）
         if files_with_images:
             print("\n" + "-" * 50)
-            print("画像ファイル情報を含むExcelファイルを作成中...")
-            print("-" * 50)
-            save_to_excel_with_images(files_with_images, "result", "検索結果.xlsx")
-            
-            print("\n" + "-" * 50)
-            print("実際の画像ファイル名を使用したCSVファイルを作成中...")
+            print("画像ファイル情報を含むExcelファイルと、実際の画像ファイル名を使用したCSVファイルを作成中...")
             print("-" * 50)
-            save_to_csv_with_image_info(files_with_images, "result", "検索結果.csv")
+            save_results(files_with_images, "result", "検索結果.xlsx", "検索結果.csv")
         else:
             print("\n画像が含まれているファイルがありませんでした。")
     else:
         print("該当するファイルが見つかりませんでした。")
     
+    # 今回の調査結果を次回の実行用に保存
+    save_scan_cache()
+    
     print("-" * 50)
     print("抽出完了")
 
@@ -1,12 +1,20 @@
 import os
-import pandas as pd
+import csv
 import zipfile
 import shutil
-from PIL import Image
 import io
 import tempfile
 from datetime import datetime
 import re
+import sys
+from zip_extract_utils import copy_entry
+from replace_utils import read_csv_text, prepare_replacement_image, run_replacement_orders
+
+# 圧縮済みの画像形式（zipに格納する際は再圧縮しない）
+COMPRESSED_MEDIA_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+# 対象画像の指定（image1, image2, ...）から番号を取り出すパターン
+IMAGE_INDEX_PATTERN = re.compile(r'image(\d+)')
 
 def load_replacement_orders(csv_file_path):
     """
@@ -23,35 +31,26 @@ def load_replacement_orders(csv_file_path):
     replacement_orders = []
     
     try:
-        # 一般的なエンコーディングで順次試行
-        encodings_to_try = ['cp932', 'shift-jis', 'utf-8', 'utf-8-sig', 'latin1']
+        # BOMがない場合は一般的なエンコーディングで順次試行
+        encodings_to_try = ['cp932', 'shift-jis', 'utf-8', 'latin1']
         
-        df = None
-        for enc in encodings_to_try:
-            try:
-                print(f"エンコーディング '{enc}' で読み込み試行中...")
-                df = pd.read_csv(csv_file_path, encoding=enc, header=None)  # ヘッダーなしで読み込み
-                print(f"エンコーディング '{enc}' で読み込み成功")
-                break
-            except Exception as e:
-                print(f"エンコーディング '{enc}' で読み込み失敗: {str(e)}")
-                continue
-        
-        if df is None:
+        text = read_csv_text(csv_file_path, encodings_to_try)
+        if text is None:
             print("CSVファイルを読み込めませんでした")
             return replacement_orders
         
+        rows = list(csv.reader(io.StringIO(text, newline='')))  # ヘッダーなしで読み込み
+        
         # 1行目がヘッダーの場合はスキップ
-        start_row = 1 if df.iloc[0, 0] == 'ファイルパス' else 0
+        start_row = 1 if rows and rows[0] and rows[0][0] == 'ファイルパス' else 0
         
-        for index in range(start_row, len(df)):
-            row = df.iloc[index]
-            file_path = row.iloc[0]  # ファイルパス
-            
+        for row in rows[start_row:]:
             # 空の行をスキップ
-            if pd.isna(file_path) or file_path == '':
+            if not row or not row[0]:
                 continue
             
+            file_path = row[0]  # ファイルパス
+            
             order = {
                 'file_path': file_path,
                 'replacements': []
@@ -60,12 +59,11 @@ def load_replacement_orders(csv_file_path):
             # 1列目以降のペア（画像名、差し替えパス）を処理
             for col_idx in range(1, len(row), 2):
                 if col_idx + 1 < len(row):
-                    target_image = row.iloc[col_idx]
-                    replacement_path = row.iloc[col_idx + 1]
+                    target_image = row[col_idx]
+                    replacement_path = row[col_idx + 1]
                     
                     # 両方の値が存在し、空でない場合に追加
-                    if (not pd.isna(target_image) and not pd.isna(replacement_path) and 
-                        target_image != '' and replacement_path != ''):
+                    if target_image and replacement_path:
                         order['replacements'].append({
                             'target': target_image,
                             'replacement_path': replacement_path
@@ -93,7 +91,7 @@ def get_image_index(target_image):
     """
     try:
         # 正規表現でimage後の数字を抽出
-        match = re.match(r'image(\d+)', target_image.lower())
+        match = IMAGE_INDEX_PATTERN.match(target_image.lower())
         if match:
             image_num = int(match.group(1))
             return image_num - 1  # 1-based index を 0-based index に変換
@@ -101,36 +99,6 @@ def get_image_index(target_image):
     except Exception:
         return -1
 
-def prepare_replacement_image(image_path):
-    """
-    差し替え用画像を準備する（適切な形式に変換）
-    
-    Args:
-        image_path (str): 差し替え用画像のパス
-        
-    Returns:
-        bytes: 変換された画像データ
-    """
-    try:
-        if not os.path.exists(image_path):
-            print(f"  → 差し替え画像が見つかりません: {image_path}")
-            return None
-        
-        # 画像を読み込み
-        with Image.open(image_path) as img:
-            # RGBに変換
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            
-            # JPEGバイトデータに変換
-            output = io.BytesIO()
-            img.save(output, format='JPEG', quality=95)
-            return output.getvalue()
-    
-    except Exception as e:
-        print(f"  → 差し替え画像の準備エラー: {str(e)}")
-        return None
-
 def replace_images_in_docx(file_path, replacements, output_dir):
     """
     .docxファイル内の画像を差し替える（全ての画像に対応）
@@ -170,6 +138,12 @@ def replace_images_in_docx(file_path, replacements, output_dir):
                 media_files.sort()  # ファイル名順にソート
                 print(f"    → 検出された画像ファイル数: {len(media_files)}")
                 
+                # ファイル名（パスを除く）から配列インデックスを引けるようにする
+                # （同名のファイルがある場合は先頭のものを使う）
+                basename_to_index = {}
+                for i, media_file in enumerate(media_files):
+                    basename_to_index.setdefault(os.path.basename(media_file), i)
+                
                 # 差し替え対象の画像データを準備
                 replacement_data = {}
                 for replacement in replacements:
@@ -177,7 +151,7 @@ def replace_images_in_docx(file_path, replacements, output_dir):
                     replacement_path = replacement['replacement_path']
                     
                     # 画像ファイル名で直接検索
-                    image_index = get_image_index_by_filename(media_files, target_image)
+                    image_index = basename_to_index.get(target_image, -1)
                     if image_index == -1:
                         print(f"    → 対象画像が見つかりません: {target_image}")
                         continue
@@ -196,16 +170,16 @@ def replace_images_in_docx(file_path, replacements, output_dir):
                     }
                 
                 # 新しいzipファイルを作成
-                with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as new_zip:
+                with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as new_zip:
                     for item in original_zip.filelist:
                         if item.filename in replacement_data:
-                            # 差し替え画像を書き込み
-                            new_zip.writestr(item.filename, replacement_data[item.filename]['data'])
+                            # 差し替え画像を書き込み（JPEGは圧縮しても縮まないため無圧縮で格納）
+                            new_zip.writestr(item.filename, replacement_data[item.filename]['data'],
+                                             compress_type=zipfile.ZIP_STORED)
                             print(f"    → {replacement_data[item.filename]['target']} を差し替えました: {replacement_data[item.filename]['source']}")
                         else:
-                            # 既存のファイルをコピー
-                            data = original_zip.read(item.filename)
-                            new_zip.writestr(item.filename, data)
+                            # 変更しないエントリは圧縮データのまま（無理ならチャンク単位で）コピー
+                            copy_entry(original_zip, item, new_zip, COMPRESSED_MEDIA_EXTENSIONS)
             
             # 一時ファイルを最終的な出力先に移動
             shutil.move(temp_path, output_path)
@@ -267,41 +241,8 @@ def process_image_replacement(csv_file_path, output_base_dir="replace_data/repla
     print(f"出力ディレクトリ: {output_dir}")
     print("-" * 60)
     
-    success_count = 0
-    fail_count = 0
-    
-    # 各ファイルの差し替え処理
-    for order in replacement_orders:
-        file_path = order['file_path']
-        replacements = order['replacements']
-        
-        print(f"処理中: {file_path}")
-        print(f"  → 差し替え指示数: {len(replacements)}")
-        
-        # ファイルの存在確認
-        if not os.path.exists(file_path):
-            print(f"  → ファイルが見つかりません")
-            fail_count += 1
-            continue
-        
-        # ファイルタイプに応じて処理
-        if file_path.endswith('.docx'):
-            result = replace_images_in_docx(file_path, replacements, output_dir)
-            if result:
-                success_count += 1
-            else:
-                fail_count += 1
-        elif file_path.endswith('.pdf'):
-            result = replace_images_in_pdf(file_path, replacements, output_dir)
-            if result:
-                success_count += 1
-            else:
-                fail_count += 1
-        else:
-            print(f"  → 対応していないファイル形式です")
-            fail_count += 1
-        
-        print()
+    # 差し替えを実行し、成功・失敗の件数を集計
+    success_count, fail_count = run_replacement_orders(replacement_orders, output_dir, replace_images_in_docx, replace_images_in_pdf)
     
     print("=" * 60)
     print(f"画像差し替え処理完了")
@@ -310,29 +251,7 @@ def process_image_replacement(csv_file_path, output_base_dir="replace_data/repla
     print(f"出力ディレクトリ: {output_dir}")
     print("=" * 60)
 
-def get_image_index_by_filename(media_files, target_filename):
-    """
-    画像ファイル名から配列インデックスを取得する
-    
-    Args:
-        media_files (list): メディアファイル名のリスト（ソート済み）
-        target_filename (str): 対象の画像ファイル名
-        
-    Returns:
-        int: 配列インデックス（見つからない場合は-1）
-    """
-    try:
-        for i, media_file in enumerate(media_files):
-            # ファイル名のみを比較（パスを除去）
-            if os.path.basename(media_file) == target_filename:
-                return i
-        return -1
-    except Exception:
-        return -1
-
 def main():
-    import sys
-    
     # コマンドライン引数からCSVファイルパスを取得
     if len(sys.argv) > 1:
         csv_file = sys.argv[1]
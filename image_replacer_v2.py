@@ -1,11 +1,18 @@
 import os
 import csv
-import pandas as pd
 import zipfile
 import shutil
 from PIL import Image
 import tempfile
 from datetime import datetime
+import codecs
+
+# CSV先頭のBOMと対応するエンコーディング
+CSV_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
 
 def detect_encoding(file_path):
     """
@@ -17,12 +24,21 @@ def detect_encoding(file_path):
     Returns:
         str: 検出されたエンコーディング
     """
-    encodings = ['cp932', 'shift_jis', 'utf-8', 'utf-8-sig', 'euc-jp', 'iso-2022-jp']
+    encodings = ['cp932', 'shift_jis', 'utf-8', 'euc-jp', 'iso-2022-jp']
+    
+    # ファイルは一度だけ読み込み、候補のデコードはメモリ上で試す
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    
+    # BOMがあればそれに従う
+    for bom, encoding in CSV_BOMS:
+        if data.startswith(bom):
+            print(f"  → エンコーディング検出: {encoding}")
+            return encoding
     
     for encoding in encodings:
         try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                f.read()
+            data.decode(encoding)
             print(f"  → エンコーディング検出: {encoding}")
             return encoding
         except UnicodeDecodeError:
@@ -52,20 +68,22 @@ def read_replacement_csv(csv_path):
         encoding = detect_encoding(csv_path)
         
         # CSVファイルを読み込み
-        df = pd.read_csv(csv_path, encoding=encoding)
+        with open(csv_path, 'r', encoding=encoding, newline='') as f:
+            rows = list(csv.reader(f))
         
         replacements = []
-        for index, row in df.iterrows():
-            file_path = str(row.iloc[0])  # 最初の列がファイルパス
+        for row in rows[1:]:  # 1行目はヘッダー
+            if not row or not row[0]:
+                continue
+            file_path = row[0]  # 最初の列がファイルパス
             
             # 残りの列から画像名と差し替えパスのペアを抽出
             replacement_pairs = []
-            for i in range(1, len(row), 2):  # 1列目から2列ずつ
-                if i + 1 < len(row) and pd.notna(row.iloc[i]) and pd.notna(row.iloc[i + 1]):
-                    image_name = str(row.iloc[i]).strip()
-                    replacement_path = str(row.iloc[i + 1]).strip()
-                    if image_name and replacement_path:
-                        replacement_pairs.append((image_name, replacement_path))
+            for i in range(1, len(row) - 1, 2):  # 1列目から2列ずつ
+                image_name = row[i].strip()
+                replacement_path = row[i + 1].strip()
+                if image_name and replacement_path:
+                    replacement_pairs.append((image_name, replacement_path))
             
             if replacement_pairs:
                 replacements.append({
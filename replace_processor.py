@@ -1,12 +1,19 @@
 import os
-import pandas as pd
+import csv
 import zipfile
 import shutil
-from PIL import Image
 import io
 import tempfile
 from datetime import datetime
 import re
+from zip_extract_utils import copy_entry
+from replace_utils import read_csv_text, prepare_replacement_image, run_replacement_orders
+
+# 圧縮済みの画像形式（zipに格納する際は再圧縮しない）
+COMPRESSED_MEDIA_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+# 対象画像の指定（image1, image2, ...）から番号を取り出すパターン
+IMAGE_INDEX_PATTERN = re.compile(r'image(\d+)')
 
 def load_replacement_orders_from_csv(csv_file_path):
     """
@@ -21,32 +28,28 @@ def load_replacement_orders_from_csv(csv_file_path):
     replacement_orders = []
     
     try:
-        # 一般的なエンコーディングで順次試行
-        encodings_to_try = ['utf-8', 'cp932', 'shift-jis', 'utf-8-sig', 'latin1']
+        # BOMがない場合は一般的なエンコーディングで順次試行
+        encodings_to_try = ['utf-8', 'cp932', 'shift-jis', 'latin1']
         
-        df = None
-        for enc in encodings_to_try:
-            try:
-                print(f"エンコーディング '{enc}' で読み込み試行中...")
-                df = pd.read_csv(csv_file_path, encoding=enc)
-                print(f"エンコーディング '{enc}' で読み込み成功")
-                break
-            except Exception as e:
-                print(f"エンコーディング '{enc}' で読み込み失敗: {str(e)}")
-                continue
+        text = read_csv_text(csv_file_path, encodings_to_try)
+        rows = list(csv.reader(io.StringIO(text, newline=''))) if text is not None else None
         
-        if df is None:
+        if not rows:
             print("CSVファイルを読み込めませんでした")
             return replacement_orders
         
-        print(f"読み込んだ行数: {len(df)}")
-        print(f"列名: {list(df.columns)}")
+        # 1行目はヘッダー
+        header = rows[0]
+        data_rows = [row for row in rows[1:] if row]
+        
+        print(f"読み込んだ行数: {len(data_rows)}")
+        print(f"列名: {header}")
         
-        for index, row in df.iterrows():
-            file_path = row.iloc[0]  # ファイルパス
+        for row in data_rows:
+            file_path = row[0]  # ファイルパス
             
             # 空の行をスキップ
-            if pd.isna(file_path) or file_path == '':
+            if not file_path:
                 continue
             
             order = {
@@ -55,34 +58,31 @@ def load_replacement_orders_from_csv(csv_file_path):
             }
             
             # 修正対象_1, 修正画像_1をチェック
-            if len(row) > 1 and not pd.isna(row.iloc[1]) and not pd.isna(row.iloc[2]):
-                target_image = row.iloc[1]  # 修正対象_1
-                replacement_image = row.iloc[2]  # 修正画像_1
-                if target_image and replacement_image:
-                    order['replacements'].append({
-                        'target': target_image,
-                        'replacement_path': replacement_image
-                    })
+            if len(row) > 2 and row[1] and row[2]:
+                target_image = row[1]  # 修正対象_1
+                replacement_image = row[2]  # 修正画像_1
+                order['replacements'].append({
+                    'target': target_image,
+                    'replacement_path': replacement_image
+                })
             
             # 修正対象_2, 修正画像_2をチェック
-            if len(row) > 3 and not pd.isna(row.iloc[3]) and not pd.isna(row.iloc[4]):
-                target_image = row.iloc[3]  # 修正対象_2
-                replacement_image = row.iloc[4]  # 修正画像_2
-                if target_image and replacement_image:
-                    order['replacements'].append({
-                        'target': target_image,
-                        'replacement_path': replacement_image
-                    })
+            if len(row) > 4 and row[3] and row[4]:
+                target_image = row[3]  # 修正対象_2
+                replacement_image = row[4]  # 修正画像_2
+                order['replacements'].append({
+                    'target': target_image,
+                    'replacement_path': replacement_image
+                })
             
             # 修正対象_3, 修正画像_3をチェック
-            if len(row) > 5 and not pd.isna(row.iloc[5]) and not pd.isna(row.iloc[6]):
-                target_image = row.iloc[5]  # 修正対象_3
-                replacement_image = row.iloc[6]  # 修正画像_3
-                if target_image and replacement_image:
-                    order['replacements'].append({
-                        'target': target_image,
-                        'replacement_path': replacement_image
-                    })
+            if len(row) > 6 and row[5] and row[6]:
+                target_image = row[5]  # 修正対象_3
+                replacement_image = row[6]  # 修正画像_3
+                order['replacements'].append({
+                    'target': target_image,
+                    'replacement_path': replacement_image
+                })
             
             # 差し替え指示がある場合のみ追加
             if order['replacements']:
@@ -106,7 +106,7 @@ def get_image_index(target_image):
     """
     try:
         # 正規表現でimage後の数字を抽出
-        match = re.match(r'image(\d+)', target_image.lower())
+        match = IMAGE_INDEX_PATTERN.match(target_image.lower())
         if match:
             image_num = int(match.group(1))
             return image_num - 1  # 1-based index を 0-based index に変換
@@ -114,36 +114,6 @@ def get_image_index(target_image):
     except Exception:
         return -1
 
-def prepare_replacement_image(image_path):
-    """
-    差し替え用画像を準備する（適切な形式に変換）
-    
-    Args:
-        image_path (str): 差し替え用画像のパス
-        
-    Returns:
-        bytes: 変換された画像データ
-    """
-    try:
-        if not os.path.exists(image_path):
-            print(f"  → 差し替え画像が見つかりません: {image_path}")
-            return None
-        
-        # 画像を読み込み
-        with Image.open(image_path) as img:
-            # RGBに変換
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            
-            # JPEGバイトデータに変換
-            output = io.BytesIO()
-            img.save(output, format='JPEG', quality=95)
-            return output.getvalue()
-    
-    except Exception as e:
-        print(f"  → 差し替え画像の準備エラー: {str(e)}")
-        return None
-
 def replace_images_in_docx(file_path, replacements, output_dir):
     """
     .docxファイル内の画像を差し替える（ファイル名のみで出力）
@@ -207,16 +177,16 @@ def replace_images_in_docx(file_path, replacements, output_dir):
                     }
                 
                 # 新しいzipファイルを作成
-                with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as new_zip:
+                with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as new_zip:
                     for item in original_zip.filelist:
                         if item.filename in replacement_data:
-                            # 差し替え画像を書き込み
-                            new_zip.writestr(item.filename, replacement_data[item.filename]['data'])
+                            # 差し替え画像を書き込み（JPEGは圧縮しても縮まないため無圧縮で格納）
+                            new_zip.writestr(item.filename, replacement_data[item.filename]['data'],
+                                             compress_type=zipfile.ZIP_STORED)
                             print(f"    → {replacement_data[item.filename]['target']} を差し替えました: {replacement_data[item.filename]['source']}")
                         else:
-                            # 既存のファイルをコピー
-                            data = original_zip.read(item.filename)
-                            new_zip.writestr(item.filename, data)
+                            # 変更しないエントリは圧縮データのまま（無理ならチャンク単位で）コピー
+                            copy_entry(original_zip, item, new_zip, COMPRESSED_MEDIA_EXTENSIONS)
             
             # 一時ファイルを最終的な出力先に移動
             shutil.move(temp_path, output_path)
@@ -284,41 +254,8 @@ def process_image_replacement_from_csv(csv_file_path, output_dir="replace_data/r
     print(f"出力ディレクトリ: {output_dir}")
     print("-" * 60)
     
-    success_count = 0
-    fail_count = 0
-    
-    # 各ファイルの差し替え処理
-    for order in replacement_orders:
-        file_path = order['file_path']
-        replacements = order['replacements']
-        
-        print(f"処理中: {file_path}")
-        print(f"  → 差し替え指示数: {len(replacements)}")
-        
-        # ファイルの存在確認
-        if not os.path.exists(file_path):
-            print(f"  → ファイルが見つかりません")
-            fail_count += 1
-            continue
-        
-        # ファイルタイプに応じて処理
-        if file_path.endswith('.docx'):
-            result = replace_images_in_docx(file_path, replacements, output_dir)
-            if result:
-                success_count += 1
-            else:
-                fail_count += 1
-        elif file_path.endswith('.pdf'):
-            result = replace_images_in_pdf(file_path, replacements, output_dir)
-            if result:
-                success_count += 1
-            else:
-                fail_count += 1
-        else:
-            print(f"  → 対応していないファイル形式です")
-            fail_count += 1
-        
-        print()
+    # 差し替えを実行し、成功・失敗の件数を集計
+    success_count, fail_count = run_replacement_orders(replacement_orders, output_dir, replace_images_in_docx, replace_images_in_pdf)
     
     print("=" * 60)
     print(f"画像差し替え処理完了")
@@ -0,0 +1,258 @@
+import os
+import io
+import sys
+import codecs
+import contextlib
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
+
+# 差し替え処理を並列実行するプロセス数
+MAX_WORKERS = os.cpu_count() or 1
+
+# 差し替え画像を再エンコードする際の展開サイズの目安
+REPLACEMENT_DRAFT_SIZE = (2048, 2048)
+
+# CSV先頭のBOMと対応するエンコーディング
+CSV_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+def read_csv_text(csv_file_path, encodings_to_try):
+    """
+    CSVファイルを一度だけ読み込み、文字列にデコードする
+    
+    BOMがあればそのエンコーディングを使い、なければ候補を順にメモリ上で試す
+    
+    Args:
+        csv_file_path (str): CSVファイルのパス
+        encodings_to_try (list): BOMがない場合に試すエンコーディングのリスト
+        
+    Returns:
+        str: デコードされた文字列（デコードできない場合はNone）
+    """
+    with open(csv_file_path, 'rb') as f:
+        data = f.read()
+    
+    for bom, enc in CSV_BOMS:
+        if data.startswith(bom):
+            print(f"BOMからエンコーディング '{enc}' を判定")
+            return data.decode(enc)
+    
+    for enc in encodings_to_try:
+        try:
+            text = data.decode(enc)
+            print(f"エンコーディング '{enc}' で読み込み成功")
+            return text
+        except UnicodeDecodeError as e:
+            print(f"エンコーディング '{enc}' で読み込み失敗: {str(e)}")
+    
+    return None
+
+# 変換済み差し替え画像のキャッシュ（キー: (絶対パス, 更新時刻, サイズ)）
+_replacement_image_cache = {}
+
+def _replacement_cache_key(image_path):
+    """
+    差し替え画像のキャッシュキーを作る
+    
+    Args:
+        image_path (str): 差し替え用画像のパス
+        
+    Returns:
+        tuple: (絶対パス, 更新時刻, サイズ)
+    """
+    stat = os.stat(image_path)
+    return (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
+
+def prepare_replacement_image(image_path):
+    """
+    差し替え用画像を準備する（適切な形式に変換）
+    
+    Args:
+        image_path (str): 差し替え用画像のパス
+        
+    Returns:
+        bytes: 変換された画像データ
+    """
+    try:
+        if not os.path.exists(image_path):
+            print(f"  → 差し替え画像が見つかりません: {image_path}")
+            return None
+        
+        # 同じ差し替え画像は変換済みのデータを再利用
+        cache_key = _replacement_cache_key(image_path)
+        cached_data = _replacement_image_cache.get(cache_key)
+        if cached_data is not None:
+            return cached_data
+        
+        # 画像を読み込み（ヘッダのみ解析される）
+        with Image.open(image_path) as img:
+            if img.format == 'JPEG' and img.mode in ('RGB', 'L'):
+                # 既にそのまま使えるJPEGはデコード・再エンコードせずに元のデータを使う
+                with open(image_path, 'rb') as f:
+                    image_data = f.read()
+            else:
+                # JPEGは展開前に縮小デコードを指定する（十分大きい画像のみ縮小され、JPEG以外では何もしない）
+                img.draft(None, REPLACEMENT_DRAFT_SIZE)
+                
+                # RGBに変換
+                if img.mode in ('RGBA', 'LA', 'P'):
+                    img = img.convert('RGB')
+                
+                # JPEGバイトデータに変換
+                output = io.BytesIO()
+                img.save(output, format='JPEG', quality=95)
+                image_data = output.getvalue()
+        
+        _replacement_image_cache[cache_key] = image_data
+        return image_data
+    
+    except Exception as e:
+        print(f"  → 差し替え画像の準備エラー: {str(e)}")
+        return None
+
+def _prime_replacement_images(orders):
+    """
+    差し替え画像を親プロセスで変換し、指示が使う分だけを取り出す
+    
+    変換結果は親プロセスのキャッシュに残るため、複数の指示で使う画像も変換は一度で済む
+    
+    Args:
+        orders (list): 差し替え指示のリスト
+        
+    Returns:
+        dict: 指示が使う変換済み差し替え画像（キー: キャッシュキー）
+    """
+    images = {}
+    # エラー出力は各ファイルの処理時に改めて出るため、ここでは捨てる
+    with contextlib.redirect_stdout(io.StringIO()):
+        for order in orders:
+            if order['file_path'].endswith('.docx'):
+                for replacement in order['replacements']:
+                    image_data = prepare_replacement_image(replacement['replacement_path'])
+                    if image_data is not None:
+                        images[_replacement_cache_key(replacement['replacement_path'])] = image_data
+    return images
+
+def _process_one(order, output_dir, replace_docx, replace_pdf):
+    """
+    1ファイル分の画像差し替えを行う（ワーカープロセスで実行される）
+    
+    Args:
+        order (dict): 差し替え指示（ファイルパスと差し替え指示のリスト）
+        output_dir (str): 出力ディレクトリのパス
+        replace_docx (callable): .docxファイルの差し替え関数
+        replace_pdf (callable): .pdfファイルの差し替え関数
+        
+    Returns:
+        tuple: (成功した場合True, ログ出力)
+    """
+    file_path = order['file_path']
+    replacements = order['replacements']
+    success = False
+    
+    # ワーカー内の出力はまとめて親プロセスへ返し、1回で書き出してもらう
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        print(f"処理中: {file_path}")
+        print(f"  → 差し替え指示数: {len(replacements)}")
+        
+        # ファイルの存在確認
+        if not os.path.exists(file_path):
+            print(f"  → ファイルが見つかりません")
+            return False, log.getvalue()
+        
+        # ファイルタイプに応じて処理
+        if file_path.endswith('.docx'):
+            success = bool(replace_docx(file_path, replacements, output_dir))
+        elif file_path.endswith('.pdf'):
+            success = bool(replace_pdf(file_path, replacements, output_dir))
+        else:
+            print(f"  → 対応していないファイル形式です")
+        
+        print()
+    
+    return success, log.getvalue()
+
+def _process_group(orders, output_dir, images, replace_docx, replace_pdf):
+    """
+    出力先が同じファイルの差し替えを順番に行う（ワーカープロセスで実行される）
+    
+    Args:
+        orders (list): 出力ファイル名が同じ差し替え指示のリスト
+        output_dir (str): 出力ディレクトリのパス
+        images (dict): 親プロセスで変換済みの、このグループが使う差し替え画像
+        replace_docx (callable): .docxファイルの差し替え関数
+        replace_pdf (callable): .pdfファイルの差し替え関数
+        
+    Returns:
+        list: 指示ごとの (成功した場合True, ログ出力)
+    """
+    _replacement_image_cache.update(images)
+    return [_process_one(order, output_dir, replace_docx, replace_pdf) for order in orders]
+
+def run_replacement_orders(replacement_orders, output_dir, replace_docx, replace_pdf):
+    """
+    差し替え指示をファイルごとにプロセス並列で実行し、ログを指示の順に書き出す
+    
+    Args:
+        replacement_orders (list): 差し替え指示のリスト
+        output_dir (str): 出力ディレクトリのパス
+        replace_docx (callable): .docxファイルの差し替え関数（モジュール直下の関数）
+        replace_pdf (callable): .pdfファイルの差し替え関数（モジュール直下の関数）
+        
+    Returns:
+        tuple: (成功したファイル数, 失敗したファイル数)
+    """
+    success_count = 0
+    fail_count = 0
+    
+    # 出力ファイル名が同じ指示は同じ出力先を書き換えるため、1つのワーカーで指示の順に処理する
+    groups = {}
+    for order in replacement_orders:
+        groups.setdefault(os.path.basename(order['file_path']), []).append(order)
+    
+    # 出力先の異なるファイル同士は独立しているためプロセス並列で実行
+    # （ログは指示の順に1ファイル分ずつまとめて書き出す）
+    # 差し替え画像は親プロセスで一度だけ変換し、各グループには使う分だけを渡す
+    max_workers = min(MAX_WORKERS, len(groups))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        group_results = {}
+        for name, group in groups.items():
+            try:
+                futures[name] = executor.submit(_process_group, group, output_dir, _prime_replacement_images(group),
+                                                replace_docx, replace_pdf)
+            except Exception as e:
+                # プールが既に壊れている場合は投入できないため、このグループは失敗として扱う
+                group_results[name] = e
+        
+        positions = {}
+        for order in replacement_orders:
+            name = os.path.basename(order['file_path'])
+            if name not in group_results:
+                try:
+                    group_results[name] = futures[name].result()
+                except Exception as e:
+                    # ワーカーが異常終了した場合はグループ内の全指示を失敗として扱い、処理を続ける
+                    group_results[name] = e
+            
+            position = positions.get(name, 0)
+            positions[name] = position + 1
+            if isinstance(group_results[name], Exception):
+                print(f"処理中: {order['file_path']}")
+                print(f"  → 差し替え処理エラー: {str(group_results[name])}")
+                print()
+                fail_count += 1
+                continue
+            
+            success, log = group_results[name][position]
+            sys.stdout.write(log)
+            if success:
+                success_count += 1
+            else:
+                fail_count += 1
+    
+    return success_count, fail_count
\ No newline at end of file
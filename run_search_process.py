@@ -1,13 +1,26 @@
 import os
-import glob
-import pandas as pd
+import sys
 import zipfile
 from PIL import Image
+import pymupdf
 import io
-import tempfile
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
 from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
 from openpyxl.drawing.image import Image as OpenpyxlImage
-from openpyxl.utils.dataframe import dataframe_to_rows
+
+def _flush_log(log):
+    """
+    溜めておいたログ行をまとめて標準出力に書き出す
+    
+    Args:
+        log (list): ログ行のリスト（書き出した後は空になる）
+    """
+    if log:
+        sys.stdout.write('\n'.join(log) + '\n')
+        log.clear()
 
 def extract_docx_pdf_files(directory_path):
     """
@@ -31,19 +44,41 @@ def extract_docx_pdf_files(directory_path):
             print(f"❌ エラー: ディレクトリが存在しません: {directory_path}")
             return found_files
         
-        # .docx ファイルを検索
-        docx_pattern = os.path.join(directory_path, "**", "*.docx")
-        docx_files = glob.glob(docx_pattern, recursive=True)
-        
-        # .pdf ファイルを検索
-        pdf_pattern = os.path.join(directory_path, "**", "*.pdf")
-        pdf_files = glob.glob(pdf_pattern, recursive=True)
+        # .docx と .pdf を1回のディレクトリ走査で振り分ける
+        # （DirEntryの種別情報を使い、ファイルごとのstatを省く）
+        docx_files = []
+        pdf_files = []
+        stack = [directory_path]
+        while stack:
+            current_dir = stack.pop()
+            try:
+                with os.scandir(current_dir) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            
+            sub_dirs = []
+            for entry in entries:
+                # 従来の検索と同様に隠しファイル・隠しディレクトリは対象外
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir():
+                    sub_dirs.append(entry.path)
+                elif entry.is_file():
+                    if entry.name.endswith('.docx'):
+                        docx_files.append(entry.path)
+                    elif entry.name.endswith('.pdf'):
+                        pdf_files.append(entry.path)
+            
+            # 深さ優先で、ディレクトリ内の並び順どおりに辿る
+            stack.extend(reversed(sub_dirs))
         
-        # 有効なファイルのみを追加
+        # ファイルごとの出力は溜めておき、まとめて1回で書き出す
+        log = []
         for file_path in docx_files + pdf_files:
-            if os.path.isfile(file_path) and os.access(file_path, os.R_OK):
-                found_files.append(file_path)
-                print(f"  📄 発見: {file_path}")
+            found_files.append(file_path)
+            log.append(f"  📄 発見: {file_path}")
+        _flush_log(log)
         
         print("-" * 60)
         print(f"✅ ステップ1完了: 合計 {len(found_files)} ファイル発見 (DOCX: {len(docx_files)}, PDF: {len(pdf_files)})")
@@ -53,61 +88,51 @@ def extract_docx_pdf_files(directory_path):
     
     return found_files
 
-def has_images_in_docx(file_path):
-    """
-    .docxファイルに画像が含まれているかチェックする
-    """
-    try:
-        if not os.path.exists(file_path) or not os.access(file_path, os.R_OK):
-            return False
-            
-        with zipfile.ZipFile(file_path, 'r') as zip_file:
-            for file_info in zip_file.filelist:
-                if file_info.filename.startswith('word/media/'):
-                    return True
-        return False
-    except (zipfile.BadZipFile, PermissionError, OSError):
-        return False
-    except Exception:
-        return False
+# 画像の判定・抽出を並列実行するワーカープロセス数
+MAX_WORKERS = min(os.cpu_count() or 1, 4)
+
+# ワーカープロセス内で縮小・PNGエンコードを並列実行するスレッド数
+# （PillowはリサイズやzlibによるエンコードのあいだGILを解放する）
+ENCODE_THREADS = max(1, (os.cpu_count() or 1) // MAX_WORKERS)
+
+# 対象とする拡張子と表示用の種別名
+FILE_KINDS = {'.docx': 'DOCX', '.pdf': 'PDF'}
 
-def has_images_in_pdf(file_path):
+# 同一内容の画像（ロゴ等）の縮小結果を使い回すキャッシュ（ワーカープロセスごと）
+# キーは元データのハッシュ（.docxはzipのCRCとサイズ）、値は埋め込み用の画像バイト列
+_thumbnail_cache = {}
+THUMBNAIL_CACHE_MAX_ENTRIES = 4096
+
+# .docxの画像はCRCとサイズが一致しても別画像の可能性があるため、
+# キーごとに最初の画像の場所（zipのパス, エントリ名）を覚えておき、一致した時だけ内容のハッシュで照合する
+# （CRCとサイズのキーは最初の画像と同じ内容の画像だけが使う）
+_docx_cache_sources = {}
+_docx_cache_digests = {}
+
+# この大きさ以下のJPEGはデコード・再エンコードせず元のバイト列をExcelに埋め込む
+PASSTHROUGH_JPEG_MAX_SIZE = 256
+
+def get_file_kind(file_path):
     """
-    .pdfファイルに画像が含まれているかチェックする
+    拡張子からファイル種別を判定する
+    
+    Args:
+        file_path (str): ファイルパス
+        
+    Returns:
+        str: 'DOCX' または 'PDF'（対象外の場合はNone）
     """
-    try:
-        if not os.path.exists(file_path) or not os.access(file_path, os.R_OK):
-            return False
-            
-        import PyPDF2
-        with open(file_path, 'rb') as pdf_file:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            if pdf_reader.is_encrypted:
-                try:
-                    pdf_reader.decrypt('')
-                except:
-                    return False
-            
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    if '/Resources' in page and '/XObject' in page['/Resources']:
-                        xObject = page['/Resources']['/XObject'].get_object()
-                        for obj in xObject:
-                            if xObject[obj]['/Subtype'] == '/Image':
-                                return True
-                except Exception:
-                    continue
-        return False
-    except Exception:
-        return False
+    return FILE_KINDS.get(os.path.splitext(file_path)[1].lower())
 
-def filter_files_with_images(file_list):
+def filter_files_with_images(file_list, extracted=None):
     """
     2. 抽出したものから、imgファイルが含まれているものだけをさらに抽出
     
+    判定のために抽出した画像は、extractedを渡すとExcel作成用にそのまま保持する
+    
     Args:
         file_list (list): ファイルパスのリスト
+        extracted (dict): ファイルパスごとの抽出結果の格納先（省略可）
         
     Returns:
         list: 画像が含まれているファイルのリスト
@@ -117,137 +142,279 @@ def filter_files_with_images(file_list):
     print(f"\n🖼️ ステップ2: 画像含有ファイル判定開始")
     print("-" * 60)
     
-    for i, file_path in enumerate(file_list, 1):
-        try:
-            print(f"  {i:2d}. チェック中: {os.path.basename(file_path)}")
+    # 判定と抽出を1回のファイルオープンで行う（結果は入力順に受け取る）
+    # ファイルごとの出力は溜めておき、まとめて1回で書き出す
+    log = []
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        results = executor.map(_extract_thumbnails, file_list)
+        
+        for i, (file_path, result) in enumerate(zip(file_list, results), 1):
+            log.append(f"  {i:2d}. チェック中: {os.path.basename(file_path)}")
             
-            if file_path.endswith('.docx'):
-                if has_images_in_docx(file_path):
-                    files_with_images.append(file_path)
-                    print(f"      ✅ 画像あり (DOCX)")
-                else:
-                    print(f"      ❌ 画像なし (DOCX)")
-                    
-            elif file_path.endswith('.pdf'):
-                if has_images_in_pdf(file_path):
-                    files_with_images.append(file_path)
-                    print(f"      ✅ 画像あり (PDF)")
-                else:
-                    print(f"      ❌ 画像なし (PDF)")
-        except Exception as e:
-            print(f"      ⚠️ ファイルチェックエラー: {str(e)}")
-            continue
+            file_kind = get_file_kind(file_path)
+            if file_kind is None:
+                continue
+            
+            # 画像の有無は画像エントリ・xrefの一覧で判定する（縮小画像を作れなかった画像も含む）
+            filenames, png_images, image_count = result
+            if image_count:
+                files_with_images.append(file_path)
+                if extracted is not None:
+                    extracted[file_path] = result
+                log.append(f"      ✅ 画像あり ({file_kind})")
+            else:
+                log.append(f"      ❌ 画像なし ({file_kind})")
+    _flush_log(log)
     
     print("-" * 60)
     print(f"✅ ステップ2完了: {len(files_with_images)}/{len(file_list)} ファイルに画像が含まれています")
     
     return files_with_images
 
-def get_media_filenames(file_path):
+def scan_docx(file_path):
     """
-    .docxファイル内の画像ファイル名のリストを取得する
+    .docxファイルを1回だけ開いて、画像ファイル名の一覧と画像を取得する
+    
+    画像はジェネレータで1枚ずつデコードするため、同時にメモリに載るのは1枚分だけになる
+    
+    Args:
+        file_path (str): .docxファイルのパス
+        
+    Returns:
+        tuple: (ソート済みの画像ファイル名のリスト, (キャッシュキー, 画像)を1つずつ返すジェネレータ)
     """
-    media_filenames = []
     try:
-        if not os.path.exists(file_path) or not os.access(file_path, os.R_OK):
-            return media_filenames
+        zip_file = zipfile.ZipFile(file_path, 'r')
+    except Exception:
+        return [], iter(())
+    
+    media_infos = []
+    media_filenames = []
+    for name, file_info in zip_file.NameToInfo.items():
+        if name.startswith('word/media/') and not file_info.is_dir():
+            media_infos.append(file_info)
+            media_filenames.append(os.path.basename(name))
+    
+    media_filenames.sort()
+    
+    return media_filenames, _iter_docx_images(zip_file, media_infos)
+
+def _iter_docx_images(zip_file, media_infos):
+    """
+    .docx内の画像を1つずつ開いて返す（読み終えるとzipファイルを閉じる）
+    
+    キャッシュ済みの画像は開かずに画像をNoneとして返す
+    
+    Args:
+        zip_file (zipfile.ZipFile): 開いている.docxファイル
+        media_infos (list): 画像エントリのZipInfoのリスト
+        
+    Yields:
+        tuple: (キャッシュキー, 画像（小さいJPEGは元のバイト列のまま）)
+    """
+    with zip_file:
+        for file_info in media_infos:
+            try:
+                if file_info.file_size == 0:
+                    continue
+                
+                # 重複は中央ディレクトリのCRCとサイズで判定し、元データを読み込まずに済ませる
+                # （CRCとサイズが以前の画像と一致した場合だけ、内容のハッシュで同じ画像か確かめる）
+                cache_key = (file_info.CRC, file_info.file_size)
+                source = _docx_cache_sources.get(cache_key)
+                if source is None and len(_docx_cache_sources) < THUMBNAIL_CACHE_MAX_ENTRIES:
+                    _docx_cache_sources[cache_key] = (zip_file.filename, file_info.filename)
+                elif source != (zip_file.filename, file_info.filename) and not _is_same_docx_entry(cache_key, zip_file, file_info):
+                    # 内容が異なる（偶然一致した）画像は、内容のハッシュをキーにする
+                    cache_key = get_image_cache_key(zip_file.read(file_info))
+                
+                if cache_key in _thumbnail_cache:
+                    yield cache_key, None
+                    continue
+                
+                # 展開済みデータ全体をメモリに載せず、zipから直接デコードする
+                # （ストリームを閉じる前にload()でデコードを済ませる）
+                with zip_file.open(file_info, 'r') as image_stream:
+                    image = Image.open(image_stream)
+                    passthrough = _is_passthrough_jpeg(image.format, image.mode, image.size)
+                    if not passthrough:
+                        # JPEGは縮小表示に足りる解像度でデコードする（PNG等では何もしない）
+                        image.draft('RGB', (200, 200))
+                        image.load()
+                
+                if passthrough:
+                    # ヘッダだけ読んだ段階で判定し、デコードせずに元データ（小さいJPEG）を使う
+                    image = zip_file.read(file_info)
+            except (Image.UnidentifiedImageError, OSError):
+                continue
+            except Exception:
+                continue
             
-        with zipfile.ZipFile(file_path, 'r') as zip_file:
-            for file_info in zip_file.filelist:
-                if file_info.filename.startswith('word/media/') and not file_info.is_dir():
-                    filename = os.path.basename(file_info.filename)
-                    media_filenames.append(filename)
+            yield cache_key, image
+
+def _is_same_docx_entry(cache_key, zip_file, file_info):
+    """
+    CRCとサイズが一致した.docx内の画像が、そのキーで最初に見つかった画像と同じ内容か確かめる
+    
+    Args:
+        cache_key (tuple): (CRC, サイズ)のキャッシュキー
+        zip_file (zipfile.ZipFile): 開いている.docxファイル
+        file_info (zipfile.ZipInfo): 確かめる画像エントリ
         
-        media_filenames.sort()
+    Returns:
+        bool: 同じ内容の場合True
+    """
+    try:
+        # 最初の画像のハッシュは、最初に一致した時に1回だけ求める
+        digest = _docx_cache_digests.get(cache_key)
+        if digest is None:
+            source_path, source_name = _docx_cache_sources[cache_key]
+            with zipfile.ZipFile(source_path, 'r') as source_zip:
+                digest = get_image_cache_key(source_zip.read(source_name))
+            _docx_cache_digests[cache_key] = digest
         
+        return get_image_cache_key(zip_file.read(file_info)) == digest
     except Exception:
-        pass
-    return media_filenames
+        return False
 
-def extract_images_from_docx(file_path):
+def scan_pdf(file_path, image_xrefs=None):
     """
-    3. .docxは内部データを展開して画像を抽出
+    .pdfファイルを1回だけ開いて、画像を1つずつ抽出するジェネレータ
+    
+    複数ページから参照される同じ画像（ロゴ等）はxref単位で1回だけ返す
+    画像はPillowで開かず、埋め込まれているデータのまま返す
+    
+    Args:
+        file_path (str): .pdfファイルのパス
+        image_xrefs (set): ページから参照されている画像のxrefの格納先（取り出せなかった画像も含む、省略可）
+        
+    Yields:
+        tuple: (フォーマット, 画像データ, (幅, 高さ), モード（不明な場合はNone）)
     """
-    images = []
     try:
-        if not os.path.exists(file_path) or not os.access(file_path, os.R_OK):
-            return images
+        with pymupdf.open(file_path) as doc:
+            if doc.needs_pass and not doc.authenticate(''):
+                return
             
-        with zipfile.ZipFile(file_path, 'r') as zip_file:
-            for file_info in zip_file.filelist:
-                if file_info.filename.startswith('word/media/') and not file_info.is_dir():
+            seen_xrefs = image_xrefs if image_xrefs is not None else set()
+            for page_num in range(doc.page_count):
+                try:
+                    # xrefだけを使うため、参照元情報を付けないfull=Falseで取得する
+                    page_images = doc.get_page_images(page_num, full=False)
+                except Exception:
+                    continue
+                
+                for xref, *_ in page_images:
+                    if xref in seen_xrefs:
+                        continue
+                    seen_xrefs.add(xref)
+                    
                     try:
-                        image_data = zip_file.read(file_info.filename)
-                        if len(image_data) == 0:
+                        # 色空間・フィルタ・プレディクタの復元はMuPDF側で行われる
+                        image_info = doc.extract_image(xref)
+                        if not image_info or len(image_info['image']) == 0:
                             continue
-                            
-                        image = Image.open(io.BytesIO(image_data))
-                        if image.mode in ('RGBA', 'LA', 'P'):
-                            image = image.convert('RGB')
-                        images.append(image)
-                    except (Image.UnidentifiedImageError, OSError):
-                        continue
+                        
+                        image_format = 'JPEG' if image_info['ext'] in ('jpeg', 'jpg') else image_info['ext'].upper()
+                        image_size = (image_info['width'], image_info['height'])
+                        image_mode = {1: 'L', 3: 'RGB'}.get(image_info['colorspace'])
                     except Exception:
                         continue
+                    
+                    yield image_format, image_info['image'], image_size, image_mode
     except Exception:
         pass
-    return images
 
-def extract_images_from_pdf(file_path):
+def _iter_pdf_images(file_path, image_xrefs=None):
     """
-    PDFファイルから画像を抽出する
+    PDF内の画像を1つずつ開いて返す（キャッシュ済みの画像は開かずに画像をNoneとして返す）
+    
+    Args:
+        file_path (str): .pdfファイルのパス
+        image_xrefs (set): ページから参照されている画像のxrefの格納先（省略可）
+        
+    Yields:
+        tuple: (キャッシュキー, 画像（小さいJPEGは元のバイト列のまま、開けない場合はNone）)
+    """
+    for image_format, image_data, image_size, image_mode in scan_pdf(file_path, image_xrefs):
+        cache_key = get_image_cache_key(image_data)
+        if cache_key in _thumbnail_cache:
+            yield cache_key, None
+        else:
+            yield cache_key, _open_pdf_image(image_format, image_data, image_size, image_mode)
+
+def _open_pdf_image(image_format, image_data, image_size, image_mode):
     """
-    images = []
+    PDFから取り出した画像データを、縮小が必要な場合だけPillowで開く
+    
+    Args:
+        image_format (str): フォーマット
+        image_data (bytes): 画像データ
+        image_size (tuple): 画像の幅と高さ
+        image_mode (str): 画像モード（不明な場合はNone）
+        
+    Returns:
+        PIL.Image.Image または bytes: 画像（小さいJPEGは元のバイト列のまま、開けない場合はNone）
+    """
+    if _is_passthrough_jpeg(image_format, image_mode, image_size):
+        return image_data
+    
     try:
-        if not os.path.exists(file_path) or not os.access(file_path, os.R_OK):
-            return images
-            
-        import PyPDF2
-        with open(file_path, 'rb') as pdf_file:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            if pdf_reader.is_encrypted:
-                try:
-                    pdf_reader.decrypt('')
-                except:
-                    return images
-            
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    if '/Resources' in page and '/XObject' in page['/Resources']:
-                        xObject = page['/Resources']['/XObject'].get_object()
-                        for obj in xObject:
-                            if xObject[obj]['/Subtype'] == '/Image':
-                                try:
-                                    img_obj = xObject[obj]
-                                    if '/Filter' in img_obj:
-                                        if img_obj['/Filter'] == '/DCTDecode':
-                                            img_data = img_obj._data
-                                            if len(img_data) > 0:
-                                                image = Image.open(io.BytesIO(img_data))
-                                                if image.mode in ('RGBA', 'LA', 'P'):
-                                                    image = image.convert('RGB')
-                                                images.append(image)
-                                        elif img_obj['/Filter'] == '/FlateDecode':
-                                            try:
-                                                width = int(img_obj['/Width'])
-                                                height = int(img_obj['/Height'])
-                                                img_data = img_obj._data
-                                                if len(img_data) > 0 and '/ColorSpace' in img_obj:
-                                                    if img_obj['/ColorSpace'] == '/DeviceRGB':
-                                                        expected_size = width * height * 3
-                                                        if len(img_data) >= expected_size:
-                                                            image = Image.frombytes('RGB', (width, height), img_data[:expected_size])
-                                                            images.append(image)
-                                            except (ValueError, TypeError):
-                                                continue
-                                except Exception:
-                                    continue
-                except Exception:
-                    continue
+        image = Image.open(io.BytesIO(image_data))
+        # JPEGは縮小表示に足りる解像度でデコードする（PNG等では何もしない）
+        image.draft('RGB', (200, 200))
+        return image
     except Exception:
-        pass
-    return images
+        return None
+
+def get_image_cache_key(image_data):
+    """
+    画像の元データから縮小結果キャッシュのキーを求める
+    
+    Args:
+        image_data (bytes): 画像の元データ
+        
+    Returns:
+        bytes: 16バイトのBLAKE2bダイジェスト
+    """
+    return hashlib.blake2b(image_data, digest_size=16).digest()
+
+def _is_passthrough_jpeg(image_format, image_mode, image_size):
+    """
+    デコードせずにそのままExcelへ埋め込めるJPEGか判定する
+    
+    Args:
+        image_format (str): 画像フォーマット
+        image_mode (str): 画像モード（不明な場合はNone）
+        image_size (tuple): 画像の幅と高さ
+        
+    Returns:
+        bool: 元のバイト列をそのまま使える場合True
+    """
+    # CMYK等はExcelで正しく表示されないことがあるため、RGBとグレースケールのみ対象
+    return (image_format == 'JPEG' and image_mode in ('RGB', 'L')
+            and max(image_size) <= PASSTHROUGH_JPEG_MAX_SIZE)
+
+def to_rgb(image):
+    """
+    画像をRGBに変換する（透過部分は白背景に合成する）
+    
+    Args:
+        image (PIL.Image.Image): 変換元の画像
+        
+    Returns:
+        PIL.Image.Image: RGB画像
+    """
+    if image.mode == 'P':
+        image = image.convert('RGBA')
+    if image.mode in ('RGBA', 'LA'):
+        # convert('RGB')はアルファを捨てるだけなので、透過部分の色が不定になる
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
 
 def resize_image_to_100px(image):
     """
@@ -257,13 +424,110 @@ def resize_image_to_100px(image):
         if image.size[0] == 0 or image.size[1] == 0:
             raise ValueError("無効な画像サイズ")
         
-        image.thumbnail((100, 100), Image.Resampling.LANCZOS)
+        # 100px程度の縮小表示ではLANCZOSと見た目の差がなく、BILINEARの方が計算量が少ない
+        image.thumbnail((100, 100), Image.Resampling.BILINEAR)
         return image
     except Exception:
         fallback_image = Image.new('RGB', (50, 50), 'white')
         return fallback_image
 
-def create_excel_with_images(file_list, output_dir="result", output_filename="検索結果.xlsx"):
+def _make_thumbnail(image):
+    """
+    画像を100px×100pxに縮小してPNGバイト列にする（エンコード用スレッドで実行される）
+    
+    Args:
+        image (PIL.Image.Image): 元の画像
+        
+    Returns:
+        bytes: PNGバイト列（変換できなかった場合はNone）
+    """
+    try:
+        # パレット画像は縮小時に最近傍補間になるため、先にRGBAへ展開する
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+        
+        # 画像を100px×100pxにリサイズし、縮小後の小さな画像で白背景に合成する
+        resized_image = to_rgb(resize_image_to_100px(image))
+        
+        buffer = io.BytesIO()
+        # openpyxlはバイト列をそのまま埋め込むだけなので、圧縮は最速の設定で十分
+        resized_image.save(buffer, 'PNG', compress_level=1)
+        return buffer.getvalue()
+    except Exception:
+        return None
+
+def _resolve_thumbnail(cache_key, item):
+    """
+    エンコード待ちの結果を取り出し、縮小結果キャッシュに登録する
+    
+    Args:
+        cache_key (bytes または tuple): キャッシュキー（キャッシュから取り出した結果の場合はNone）
+        item (Future または bytes): エンコード中のFuture、またはそのまま使うバイト列
+        
+    Returns:
+        bytes: 画像バイト列（変換できなかった場合はNone）
+    """
+    if isinstance(item, Future):
+        item = item.result()
+    
+    if cache_key is not None and item is not None and len(_thumbnail_cache) < THUMBNAIL_CACHE_MAX_ENTRIES:
+        _thumbnail_cache[cache_key] = item
+    return item
+
+def _extract_thumbnails(file_path):
+    """
+    1ファイル分の画像を抽出し、100px×100pxのPNGバイト列にする（ワーカープロセスで実行される）
+    
+    PIL画像はプロセス間で受け渡さず、エンコード済みのバイト列で返す
+    （小さいJPEGは縮小せず元のバイト列のまま返し、表示サイズはExcel側で合わせる）
+    
+    Args:
+        file_path (str): ファイルパス
+        
+    Returns:
+        tuple: (画像ファイル名のリスト, 画像バイト列のリスト（変換できなかった画像はNone）,
+                画像エントリ・画像xrefの数（縮小画像を作れなかった画像も含む）)
+    """
+    filenames = []
+    png_images = []
+    image_xrefs = set()
+    file_kind = get_file_kind(file_path)
+    try:
+        images = ()
+        if file_kind == 'DOCX':
+            filenames, images = scan_docx(file_path)
+        elif file_kind == 'PDF':
+            images = _iter_pdf_images(file_path, image_xrefs)
+        
+        # 画像は順に受け取り、縮小・エンコードをスレッドに渡す
+        # （同時に抱える画像はスレッド数の2倍までに抑え、結果は元の順序で受け取る）
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=ENCODE_THREADS) as executor:
+            for cache_key, image in images:
+                if cache_key in _thumbnail_cache:
+                    pending.append((None, _thumbnail_cache[cache_key]))
+                elif image is None:
+                    continue
+                elif isinstance(image, bytes):
+                    pending.append((cache_key, image))
+                else:
+                    pending.append((cache_key, executor.submit(_make_thumbnail, image)))
+                
+                if len(pending) >= ENCODE_THREADS * 2:
+                    png_images.append(_resolve_thumbnail(*pending.popleft()))
+            
+            while pending:
+                png_images.append(_resolve_thumbnail(*pending.popleft()))
+        
+        if file_kind == 'PDF':
+            filenames = [f"pdf_image{i+1}" for i in range(len(png_images))]
+    except Exception:
+        pass
+    
+    image_count = len(filenames) if file_kind == 'DOCX' else len(image_xrefs)
+    return filenames, png_images, image_count
+
+def create_excel_with_images(file_list, output_dir="result", output_filename="検索結果.xlsx", extracted=None):
     """
     4-5. 新規Excelを作成し、ファイルパスをA列に並べ、
          埋め込まれているimgファイルを100px×100pxで表示してresultディレクトリに出力
@@ -272,6 +536,7 @@ def create_excel_with_images(file_list, output_dir="result", output_filename="
         file_list (list): 画像含有ファイルのリスト
         output_dir (str): 出力ディレクトリ
         output_filename (str): 出力するExcelファイル名
+        extracted (dict): filter_files_with_imagesで抽出済みの結果（省略可）
     """
     if not file_list:
         print("❌ 保存するファイルがありません。")
@@ -284,30 +549,37 @@ def create_excel_with_images(file_list, output_dir="result", output_filename="
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, output_filename)
     
-    # 新しいワークブックを作成
-    wb = Workbook()
-    ws = wb.active
+    # 新しいワークブックを作成（行を書き出した順にストリーム出力し、メモリに保持しない）
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    
+    # 画像の抽出・縮小・エンコードはプロセス並列で行い、Excelへの書き込みはメインプロセスで行う
+    # （openpyxlのワークブックはプロセス間で共有できない）
+    # 判定時に抽出済みのファイルは再度開かずに結果を使い回す
+    print("  🔍 画像ファイル名調査・画像抽出中...")
+    if extracted is None:
+        extracted = {}
+    pending_files = [file_path for file_path in file_list if file_path not in extracted]
+    if pending_files:
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            extracted.update(zip(pending_files, executor.map(_extract_thumbnails, pending_files)))
+    results = [extracted[file_path] for file_path in file_list]
     
     # 全ファイルの画像ファイル名を調査
     all_image_filenames = set()
     file_image_map = {}
     
-    print("  🔍 画像ファイル名調査中...")
-    for file_path in file_list:
-        try:
-            if file_path.endswith('.docx'):
-                media_filenames = get_media_filenames(file_path)
-                file_image_map[file_path] = media_filenames
-                all_image_filenames.update(media_filenames)
-                print(f"    📄 {os.path.basename(file_path)}: {len(media_filenames)}個の画像")
-            elif file_path.endswith('.pdf'):
-                images = extract_images_from_pdf(file_path)
-                pdf_filenames = [f"pdf_image{i+1}" for i in range(len(images))]
-                file_image_map[file_path] = pdf_filenames
-                all_image_filenames.update(pdf_filenames)
-                print(f"    📑 {os.path.basename(file_path)}: {len(images)}個の画像")
-        except Exception:
-            file_image_map[file_path] = []
+    # ファイルごとの出力は溜めておき、まとめて1回で書き出す
+    log = []
+    for file_path, (filenames, png_images, _) in zip(file_list, results):
+        file_image_map[file_path] = filenames
+        all_image_filenames.update(filenames)
+        file_kind = get_file_kind(file_path)
+        if file_kind == 'DOCX':
+            log.append(f"    📄 {os.path.basename(file_path)}: {len(filenames)}個の画像")
+        elif file_kind == 'PDF':
+            log.append(f"    📑 {os.path.basename(file_path)}: {len(png_images)}個の画像")
+    _flush_log(log)
     
     # 画像ファイル名をソート
     sorted_image_filenames = sorted(all_image_filenames)
@@ -315,100 +587,70 @@ def create_excel_with_images(file_list, output_dir="result", output_filename="
     
     print(f"    📊 ユニークな画像ファイル名数: {max_images}")
     
-    # ヘッダーを動的に設定
-    ws['A1'] = 'ファイルパス'
-    for i, filename in enumerate(sorted_image_filenames):
-        col_letter = chr(ord('B') + i) if i < 25 else f"A{chr(ord('A') + i - 25)}"
-        ws[f'{col_letter}1'] = filename
-    
+    # 書き込み専用モードでは行の追加前にシートの書式を決めておく
     # 行の高さを設定（100px用）
-    for row in range(2, len(file_list) + 2):
-        ws.row_dimensions[row].height = 75
+    # 行ごとに設定せず、シートの既定の高さとして1回だけ指定する（ヘッダー行は標準の高さ）
+    ws.sheet_format.defaultRowHeight = 75
+    ws.sheet_format.customHeight = True
+    ws.row_dimensions[1].height = 15
     
     # 列の幅を設定
     ws.column_dimensions['A'].width = 50
-    for i in range(max_images):
-        col_letter = chr(ord('B') + i) if i < 25 else f"A{chr(ord('A') + i - 25)}"
-        ws.column_dimensions[col_letter].width = 15
+    if max_images > 0:
+        # 画像列はB列から連続しているため、1つの列範囲としてまとめて指定する
+        image_columns = ws.column_dimensions['B']
+        image_columns.width = 15
+        image_columns.min = 2
+        image_columns.max = max_images + 1
     
-    temp_files = []
+    # ヘッダーを動的に設定
+    ws.append(['ファイルパス'] + sorted_image_filenames)
     
-    try:
-        print("  🖼️ 画像抽出・配置中...")
-        for idx, file_path in enumerate(file_list, start=2):
-            try:
-                print(f"    {idx-1:2d}. 処理中: {os.path.basename(file_path)}")
-                
-                # A列にファイルパスを設定
-                ws[f'A{idx}'] = file_path
-                
-                # 画像を抽出
-                images = []
-                current_filenames = file_image_map.get(file_path, [])
-                
-                if file_path.endswith('.docx'):
-                    images = extract_images_from_docx(file_path)
-                elif file_path.endswith('.pdf'):
-                    images = extract_images_from_pdf(file_path)
-                
-                # 実際のファイル名と画像を対応付けて配置
-                for img_idx, (filename, image) in enumerate(zip(current_filenames, images)):
-                    try:
-                        if filename in sorted_image_filenames:
-                            col_idx = sorted_image_filenames.index(filename)
-                            col_letter = chr(ord('B') + col_idx) if col_idx < 25 else f"A{chr(ord('A') + col_idx - 25)}"
-                            
-                            # 画像を100px×100pxにリサイズ
-                            resized_image = resize_image_to_100px(image.copy())
-                            
-                            # 一時ファイルを作成
-                            temp_fd, temp_path = tempfile.mkstemp(suffix='.png')
-                            temp_files.append(temp_path)
-                            
-                            try:
-                                os.close(temp_fd)
-                                resized_image.save(temp_path, 'PNG', optimize=True)
-                                
-                                if os.path.getsize(temp_path) > 10 * 1024 * 1024:
-                                    continue
-                                
-                                # Excelに画像を挿入
-                                img = OpenpyxlImage(temp_path)
-                                img.width = 100
-                                img.height = 100
-                                
-                                cell_location = f'{col_letter}{idx}'
-                                ws.add_image(img, cell_location)
-                                
-                            except Exception:
-                                pass
-                    except Exception:
-                        continue
-                
-                print(f"        ✅ {len(images)}個の画像を配置完了")
-            except Exception:
-                continue
-        
-        # Excelファイルを保存
+    # 画像ファイル名から配置先の列（B列から順）を引けるようにしておく
+    name_to_letter = {filename: get_column_letter(i + 2) for i, filename in enumerate(sorted_image_filenames)}
+    
+    print("  🖼️ 画像配置中...")
+    for idx, (file_path, (current_filenames, png_images, _)) in enumerate(zip(file_list, results), start=2):
         try:
-            wb.save(output_path)
-            print(f"\n✅ ステップ4-5完了: Excelファイルを保存しました")
-            print(f"   📁 出力パス: {os.path.abspath(output_path)}")
-        except (PermissionError, OSError) as e:
-            import time
-            alt_filename = f"検索結果_{int(time.time())}.xlsx"
-            alt_path = os.path.join(output_dir, alt_filename)
-            wb.save(alt_path)
-            print(f"✅ 代替ファイル名で保存: {os.path.abspath(alt_path)}")
-    
-    finally:
-        # 一時ファイルをクリーンアップ
-        for temp_path in temp_files:
-            try:
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-            except Exception:
-                pass
+            log.append(f"    {idx-1:2d}. 処理中: {os.path.basename(file_path)}")
+            
+            # A列にファイルパスを設定
+            ws.append([file_path])
+            
+            # 実際のファイル名と画像を対応付けて配置
+            for img_idx, (filename, png_data) in enumerate(zip(current_filenames, png_images)):
+                try:
+                    if png_data is None or len(png_data) > 10 * 1024 * 1024:
+                        continue
+                    
+                    col_letter = name_to_letter.get(filename)
+                    if col_letter is not None:
+                        # Excelに画像を挿入（一時ファイルを介さずメモリ上のPNGを渡す）
+                        img = OpenpyxlImage(io.BytesIO(png_data))
+                        img.width = 100
+                        img.height = 100
+                        
+                        cell_location = f'{col_letter}{idx}'
+                        ws.add_image(img, cell_location)
+                except Exception:
+                    continue
+            
+            log.append(f"        ✅ {len(png_images)}個の画像を配置完了")
+        except Exception:
+            continue
+    _flush_log(log)
+    
+    # Excelファイルを保存
+    try:
+        wb.save(output_path)
+        print(f"\n✅ ステップ4-5完了: Excelファイルを保存しました")
+        print(f"   📁 出力パス: {os.path.abspath(output_path)}")
+    except (PermissionError, OSError) as e:
+        import time
+        alt_filename = f"検索結果_{int(time.time())}.xlsx"
+        alt_path = os.path.join(output_dir, alt_filename)
+        wb.save(alt_path)
+        print(f"✅ 代替ファイル名で保存: {os.path.abspath(alt_path)}")
 
 def main():
     """
@@ -427,15 +669,16 @@ def main():
         print("❌ 該当するファイルが見つかりませんでした。")
         return
     
-    # 2. 画像含有ファイル判定
-    files_with_images = filter_files_with_images(files)
+    # 2. 画像含有ファイル判定（抽出した画像はExcel作成で使い回す）
+    extracted = {}
+    files_with_images = filter_files_with_images(files, extracted)
     
     if not files_with_images:
         print("❌ 画像が含まれているファイルがありませんでした。")
         return
     
     # 3-5. DOCX内部データ展開 + Excel作成 + 画像表示・出力
-    create_excel_with_images(files_with_images, "result", "検索結果.xlsx")
+    create_excel_with_images(files_with_images, "result", "検索結果.xlsx", extracted)
     
     print("\n" + "=" * 80)
     print("🎉 全プロセス完了！")
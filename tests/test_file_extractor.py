@@ -0,0 +1,73 @@
+import os
+import zipfile
+
+from PIL import Image
+
+import file_extractor
+
+class _BrokenDoc:
+    """2枚目の画像の一覧を読む途中で壊れるPDFの代わり"""
+    needs_pass = False
+    page_count = 1
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def get_page_images(self, page_num, full=True):
+        yield (1, 0, 10, 10, 8, 'DeviceRGB', '', 'Im1', 'DCTDecode')
+        raise RuntimeError('broken xref table')
+
+def test_partial_pdf_scan_does_not_cache_image_count(tmp_path, monkeypatch):
+    pdf_path = tmp_path / 'broken.pdf'
+    pdf_path.write_bytes(b'%PDF-1.4')
+    monkeypatch.setattr(file_extractor, '_scan_cache', {})
+    monkeypatch.setattr(file_extractor.pymupdf, 'open', lambda path: _BrokenDoc())
+    monkeypatch.setattr(file_extractor, '_open_pdf_image', lambda doc, xref, image_filter: Image.new('RGB', (10, 10)))
+    
+    assert len(list(file_extractor.iter_pdf_images(str(pdf_path)))) == 1
+    assert file_extractor._get_scan_cache_entry(str(pdf_path))[4] is None
+
+def _write_docx(path, media_names):
+    with zipfile.ZipFile(path, 'w') as docx:
+        docx.writestr(zipfile.ZipInfo('word/document.xml', date_time=(2024, 1, 1, 0, 0, 0)), b'<w:document/>')
+        for name in media_names:
+            docx.writestr(zipfile.ZipInfo(f'word/media/{name}', date_time=(2024, 1, 1, 0, 0, 0)), b'0123456789')
+
+def test_scan_cache_is_reused_until_mtime_or_size_changes(tmp_path, monkeypatch):
+    docx_path = tmp_path / 'doc.docx'
+    cache_path = str(tmp_path / 'result' / '.cache.pkl')
+    monkeypatch.setattr(file_extractor, '_scan_cache', {})
+    
+    _write_docx(docx_path, ['image1.png'])
+    os.utime(docx_path, ns=(1_700_000_000_000_000_000, 1_700_000_000_000_000_000))
+    assert file_extractor.get_media_filenames(str(docx_path)) == ['image1.png']
+    
+    # 保存したキャッシュを読み込み直して使う
+    file_extractor.save_scan_cache(cache_path)
+    file_extractor._scan_cache.clear()
+    file_extractor.load_scan_cache(cache_path)
+    
+    # 更新日時とサイズが同じなら、中身が変わっていてもキャッシュの結果を返す
+    _write_docx(docx_path, ['image2.png'])
+    os.utime(docx_path, ns=(1_700_000_000_000_000_000, 1_700_000_000_000_000_000))
+    assert file_extractor.get_media_filenames(str(docx_path)) == ['image1.png']
+    
+    # 更新日時が変わったら調べ直す
+    os.utime(docx_path, ns=(1_700_000_001_000_000_000, 1_700_000_001_000_000_000))
+    assert file_extractor.get_media_filenames(str(docx_path)) == ['image2.png']
+    
+    # サイズが変わったら、更新日時が同じでも調べ直す
+    _write_docx(docx_path, ['image2.png', 'image3.png'])
+    os.utime(docx_path, ns=(1_700_000_001_000_000_000, 1_700_000_001_000_000_000))
+    assert file_extractor.get_media_filenames(str(docx_path)) == ['image2.png', 'image3.png']
+
+def test_scan_cache_ignores_unreadable_cache_file(tmp_path, monkeypatch):
+    cache_path = tmp_path / '.cache.pkl'
+    cache_path.write_bytes(b'not a pickle')
+    monkeypatch.setattr(file_extractor, '_scan_cache', {})
+    
+    file_extractor.load_scan_cache(str(cache_path))
+    assert file_extractor._scan_cache == {}
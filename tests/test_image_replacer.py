@@ -0,0 +1,40 @@
+import codecs
+
+from image_replacer import load_replacement_orders
+
+ROWS = [
+    'ファイルパス,画像名1,差し替えパス1,画像名2,差し替えパス2',
+    'data/報告書.docx,image1.png,logo/新ロゴ.png,image2.png,',
+    ',image1.png,logo/新ロゴ.png',
+    '',
+    'data/議事録.docx,,logo/新ロゴ.png,image3.jpeg,logo/新ロゴ.png',
+    'data/画像なし.docx,,,,',
+]
+
+EXPECTED = [
+    {'file_path': 'data/報告書.docx',
+     'replacements': [{'target': 'image1.png', 'replacement_path': 'logo/新ロゴ.png'}]},
+    {'file_path': 'data/議事録.docx',
+     'replacements': [{'target': 'image3.jpeg', 'replacement_path': 'logo/新ロゴ.png'}]},
+]
+
+def _write_csv(tmp_path, data):
+    csv_path = tmp_path / 'order.csv'
+    csv_path.write_bytes(data)
+    return str(csv_path)
+
+def test_load_orders_from_cp932(tmp_path):
+    csv_path = _write_csv(tmp_path, '\r\n'.join(ROWS).encode('cp932'))
+    assert load_replacement_orders(csv_path) == EXPECTED
+
+def test_load_orders_from_utf8_bom(tmp_path):
+    csv_path = _write_csv(tmp_path, codecs.BOM_UTF8 + '\n'.join(ROWS).encode('utf-8'))
+    assert load_replacement_orders(csv_path) == EXPECTED
+
+def test_load_orders_from_utf16_bom(tmp_path):
+    csv_path = _write_csv(tmp_path, '\r\n'.join(ROWS).encode('utf-16'))
+    assert load_replacement_orders(csv_path) == EXPECTED
+
+def test_load_orders_without_header(tmp_path):
+    csv_path = _write_csv(tmp_path, '\n'.join(ROWS[1:]).encode('utf-8'))
+    assert load_replacement_orders(csv_path) == EXPECTED
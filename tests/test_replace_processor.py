@@ -0,0 +1,37 @@
+import codecs
+
+from replace_processor import load_replacement_orders_from_csv
+
+ROWS = [
+    'ファイルパス,修正対象_1,修正画像_1,修正対象_2,修正画像_2,修正対象_3,修正画像_3',
+    'data/報告書.docx,image1,logo/新ロゴ.png,,,image3,logo/新ロゴ.png',
+    ',image1,logo/新ロゴ.png',
+    '',
+    'data/議事録.docx,image2,',
+    'data/短い行.docx,image1,logo/新ロゴ.png',
+]
+
+EXPECTED = [
+    {'file_path': 'data/報告書.docx',
+     'replacements': [{'target': 'image1', 'replacement_path': 'logo/新ロゴ.png'},
+                      {'target': 'image3', 'replacement_path': 'logo/新ロゴ.png'}]},
+    {'file_path': 'data/短い行.docx',
+     'replacements': [{'target': 'image1', 'replacement_path': 'logo/新ロゴ.png'}]},
+]
+
+def _write_csv(tmp_path, data):
+    csv_path = tmp_path / '検索結果.csv'
+    csv_path.write_bytes(data)
+    return str(csv_path)
+
+def test_load_orders_from_utf8_bom(tmp_path):
+    csv_path = _write_csv(tmp_path, codecs.BOM_UTF8 + '\r\n'.join(ROWS).encode('utf-8'))
+    assert load_replacement_orders_from_csv(csv_path) == EXPECTED
+
+def test_load_orders_from_cp932(tmp_path):
+    csv_path = _write_csv(tmp_path, '\r\n'.join(ROWS).encode('cp932'))
+    assert load_replacement_orders_from_csv(csv_path) == EXPECTED
+
+def test_load_orders_from_header_only(tmp_path):
+    csv_path = _write_csv(tmp_path, ROWS[0].encode('utf-8'))
+    assert load_replacement_orders_from_csv(csv_path) == []
@@ -0,0 +1,86 @@
+import io
+import zipfile
+import zlib
+
+import pymupdf
+from PIL import Image
+
+from run_search_process import _extract_thumbnails, filter_files_with_images
+
+def _write_pdf(path, image_stream=None):
+    buffer = io.BytesIO()
+    Image.new('RGB', (300, 300), 'red').save(buffer, 'PNG')
+    
+    doc = pymupdf.open()
+    page = doc.new_page()
+    xref = page.insert_image(pymupdf.Rect(0, 0, 100, 100), stream=buffer.getvalue())
+    if image_stream is not None:
+        # 画像として読めないデータに置き換える
+        doc.update_stream(xref, image_stream, compress=False)
+        doc.xref_set_key(xref, 'Filter', '/DCTDecode')
+    doc.save(str(path))
+    doc.close()
+
+def test_filter_keeps_pdf_whose_images_do_not_decode(tmp_path):
+    good_pdf = tmp_path / 'good.pdf'
+    broken_pdf = tmp_path / 'broken.pdf'
+    empty_pdf = tmp_path / 'empty.pdf'
+    _write_pdf(good_pdf)
+    _write_pdf(broken_pdf, b'not an image at all')
+    doc = pymupdf.open()
+    doc.new_page()
+    doc.save(str(empty_pdf))
+    doc.close()
+    
+    extracted = {}
+    file_list = [str(good_pdf), str(broken_pdf), str(empty_pdf)]
+    assert filter_files_with_images(file_list, extracted) == [str(good_pdf), str(broken_pdf)]
+    
+    # 縮小画像を作れなかった画像はExcelのセルに載せない
+    assert len(extracted[str(good_pdf)][1]) == 1
+    assert extracted[str(broken_pdf)][:2] == ([], [])
+
+def _crc32_suffix(data, target_crc):
+    """data + 4バイトのCRC32がtarget_crcになる4バイトを求める"""
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xEDB88320 if crc & 1 else crc >> 1
+        table.append(crc)
+    top_byte_to_index = {value >> 24: i for i, value in enumerate(table)}
+    
+    indexes = []
+    crc = target_crc ^ 0xFFFFFFFF
+    for _ in range(4):
+        index = top_byte_to_index[crc >> 24]
+        indexes.append(index)
+        crc = ((crc ^ table[index]) << 8) & 0xFFFFFFFF
+    
+    suffix = bytearray()
+    crc = zlib.crc32(data) ^ 0xFFFFFFFF
+    for index in reversed(indexes):
+        suffix.append((crc ^ index) & 0xFF)
+        crc = (crc >> 8) ^ table[index]
+    return bytes(suffix)
+
+def test_docx_thumbnails_do_not_mix_up_crc_collisions(tmp_path):
+    images = []
+    for color in ('red', 'blue'):
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300), color).save(buffer, 'PNG')
+        images.append(buffer.getvalue())
+    
+    # PNGの後ろに付けたデータは読み込み時に無視されるため、CRCとサイズを揃えられる
+    red = images[0] + b'\0' * (len(images[1]) + 4 - len(images[0]))
+    blue = images[1] + _crc32_suffix(images[1], zlib.crc32(red))
+    assert len(red) == len(blue) and zlib.crc32(red) == zlib.crc32(blue)
+    
+    colors = []
+    for name, data in (('red.docx', red), ('blue.docx', blue)):
+        with zipfile.ZipFile(tmp_path / name, 'w') as docx:
+            docx.writestr('word/media/image1.png', data)
+        filenames, thumbnails, image_count = _extract_thumbnails(str(tmp_path / name))
+        colors.append(Image.open(io.BytesIO(thumbnails[0])).convert('RGB').getpixel((5, 5)))
+    
+    assert colors == [(255, 0, 0), (0, 0, 255)]
@@ -0,0 +1,65 @@
+import os
+import struct
+import zipfile
+import zlib
+
+from zip_extract_utils import copy_entry, copy_entry_raw
+
+SAMPLE_DOCX = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'test_directory', 'data', 'img_news_word.docx')
+
+def _assert_same_members(source_path, copy_path):
+    with zipfile.ZipFile(source_path) as source, zipfile.ZipFile(copy_path) as copy:
+        assert copy.testzip() is None
+        assert copy.namelist() == source.namelist()
+        for info in source.infolist():
+            copied = copy.getinfo(info.filename)
+            assert copied.CRC == info.CRC
+            assert copied.compress_type == info.compress_type
+            assert copy.read(info.filename) == source.read(info.filename)
+
+def test_copy_entry_raw_round_trips_docx(tmp_path):
+    copy_path = tmp_path / 'copy.docx'
+    with zipfile.ZipFile(SAMPLE_DOCX) as source, zipfile.ZipFile(copy_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as new_zip:
+        for info in source.infolist():
+            assert copy_entry_raw(source, info, new_zip)
+    
+    _assert_same_members(SAMPLE_DOCX, copy_path)
+
+def test_copy_entry_raw_keeps_extra_field(tmp_path):
+    source_path = tmp_path / 'source.zip'
+    copy_path = tmp_path / 'copy.zip'
+    extra = struct.pack('<HH', 0x5455, 5) + b'\x01\x00\x00\x00\x00'
+    with zipfile.ZipFile(source_path, 'w', zipfile.ZIP_DEFLATED) as source:
+        info = zipfile.ZipInfo('word/document.xml', date_time=(2024, 1, 1, 0, 0, 0))
+        info.extra = extra
+        source.writestr(info, b'<w:document/>' * 100, compress_type=zipfile.ZIP_DEFLATED)
+    
+    with zipfile.ZipFile(source_path) as source, zipfile.ZipFile(copy_path, 'w') as new_zip:
+        assert copy_entry_raw(source, source.getinfo('word/document.xml'), new_zip)
+    
+    _assert_same_members(source_path, copy_path)
+    with zipfile.ZipFile(copy_path) as copy:
+        assert copy.getinfo('word/document.xml').extra == extra
+
+def test_copy_entry_falls_back_with_requested_compresslevel(tmp_path):
+    source_path = tmp_path / 'source.zip'
+    copy_path = tmp_path / 'copy.zip'
+    data = os.urandom(4096).hex().encode() * 8
+    with zipfile.ZipFile(source_path, 'w', zipfile.ZIP_BZIP2) as source:
+        source.writestr('word/document.xml', data)
+        source.writestr('word/media/image1.png', data)
+    
+    with zipfile.ZipFile(source_path) as source, zipfile.ZipFile(copy_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as new_zip:
+        for info in source.infolist():
+            assert not copy_entry_raw(source, info, new_zip)
+            copy_entry(source, info, new_zip, ('.png',))
+    
+    compressor = zlib.compressobj(1, zlib.DEFLATED, -15)
+    level1_size = len(compressor.compress(data) + compressor.flush())
+    with zipfile.ZipFile(copy_path) as copy:
+        assert copy.testzip() is None
+        assert copy.read('word/document.xml') == data
+        assert copy.getinfo('word/document.xml').compress_type == zipfile.ZIP_DEFLATED
+        assert copy.getinfo('word/document.xml').compress_size == level1_size
+        assert copy.getinfo('word/media/image1.png').compress_type == zipfile.ZIP_STORED
@@ -0,0 +1,262 @@
+import os
+import zipfile
+import struct
+import shutil
+import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+# zipエントリ展開時のコピー・書き込みバッファサイズ
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# 1ファイル内のエントリを並列展開するスレッド数
+EXTRACT_WORKERS = 4
+
+# 削除待ちディレクトリの退避名を一意にするための連番
+_trash_counter = itertools.count()
+
+# os.sendfileが使える環境か（Windowsでは使えない）
+_HAS_SENDFILE = hasattr(os, 'sendfile')
+
+# ローカルファイルヘッダ（30バイト）のうち署名・ファイル名長・拡張フィールド長だけを読む
+# （zipfileの非公開定数に頼らず、zip仕様のレイアウトを直接使う）
+LOCAL_HEADER = struct.Struct('<4s22xHH')
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+# ZIP64拡張フィールドのID（書き込み時にzipfileが付け直す）
+ZIP64_EXTRA_ID = 0x0001
+
+def discard_directory(dir_path):
+    """
+    既存ディレクトリを退避名にリネームし、削除はバックグラウンドで行う
+    
+    Args:
+        dir_path (str): 削除するディレクトリのパス
+    """
+    # リネームは即座に終わるため、展開処理は削除の完了を待たずに開始できる
+    trash_path = f"{dir_path}.old-{os.getpid()}-{next(_trash_counter)}"
+    os.rename(dir_path, trash_path)
+    
+    # 非デーモンスレッドにしてプロセス終了時には削除完了を待つ
+    threading.Thread(target=shutil.rmtree, args=(trash_path,), kwargs={'ignore_errors': True}).start()
+
+def _local_data_offset(header, header_offset):
+    """
+    ローカルファイルヘッダの内容からエントリのデータ開始位置を求める
+    
+    Args:
+        header (bytes): ローカルファイルヘッダ（固定長部分）
+        header_offset (int): ローカルファイルヘッダの位置
+        
+    Returns:
+        int: データ開始位置（ヘッダが不正な場合はNone）
+    """
+    if len(header) != LOCAL_HEADER.size:
+        return None
+    
+    signature, name_length, extra_length = LOCAL_HEADER.unpack(header)
+    if signature != LOCAL_HEADER_SIGNATURE:
+        return None
+    
+    return header_offset + LOCAL_HEADER.size + name_length + extra_length
+
+def stored_data_offset(zip_fd, entry_info):
+    """
+    無圧縮(STORED)エントリのデータ開始位置をローカルヘッダから求める
+    
+    Args:
+        zip_fd (int): zipファイルのファイルディスクリプタ
+        entry_info (zipfile.ZipInfo): 対象エントリ
+        
+    Returns:
+        int: データ開始位置（ヘッダが不正な場合はNone）
+    """
+    header = os.pread(zip_fd, LOCAL_HEADER.size, entry_info.header_offset)
+    return _local_data_offset(header, entry_info.header_offset)
+
+def send_stored_entry(zip_fd, entry_info, output_file_path):
+    """
+    無圧縮エントリの中身をos.sendfileでzipから出力ファイルへ直接コピーする
+    
+    Args:
+        zip_fd (int): zipファイルのファイルディスクリプタ
+        entry_info (zipfile.ZipInfo): 対象エントリ
+        output_file_path (str): 出力ファイルのパス
+        
+    Returns:
+        bool: コピーできた場合True（通常の展開に切り替える場合False）
+    """
+    # 暗号化されたエントリは復号が必要なため対象外
+    if entry_info.compress_type != zipfile.ZIP_STORED or entry_info.flag_bits & 0x1:
+        return False
+    
+    offset = stored_data_offset(zip_fd, entry_info)
+    if offset is None:
+        return False
+    
+    with open(output_file_path, 'wb') as dst:
+        out_fd = dst.fileno()
+        remaining = entry_info.file_size
+        while remaining > 0:
+            sent = os.sendfile(out_fd, zip_fd, offset, remaining)
+            if sent == 0:
+                raise EOFError(f"zipデータが途中で終了しています: {entry_info.filename}")
+            offset += sent
+            remaining -= sent
+    
+    return True
+
+def extract_entries(zip_path, entry_infos, output_dir):
+    """
+    指定したzipエントリ群を展開する（スレッドごとに専用のZipFileを開く）
+    
+    出力先のディレクトリは事前に作成されている前提
+    
+    Args:
+        zip_path (str): zipファイルのパス
+        entry_infos (list): 展開するエントリのZipInfoのリスト
+        output_dir (str): 出力ディレクトリのパス
+    """
+    # コピー用バッファはこのワーカー内の全エントリで使い回す
+    # （スレッドごとに確保するためモジュール共有にはしない）
+    buffer = bytearray(COPY_BUFFER_SIZE)
+    view = memoryview(buffer)
+    
+    # ZipFileのハンドルはスレッド間で共有できないため個別に開く
+    with zipfile.ZipFile(zip_path, 'r') as zip_file:
+        # 無圧縮エントリ（主に画像）はカーネル内コピーで書き出す
+        zip_fd = zip_file.fp.fileno() if _HAS_SENDFILE else None
+        
+        for entry_info in entry_infos:
+            output_file_path = os.path.join(output_dir, entry_info.filename)
+            
+            if zip_fd is not None and send_stored_entry(zip_fd, entry_info, output_file_path):
+                continue
+            
+            # 1MiBバッファでストリーム展開（エントリ全体をメモリに載せない）
+            # ZipInfoを直接渡して名前からの引き直しを省く
+            with zip_file.open(entry_info, 'r') as src, open(output_file_path, 'wb', buffering=COPY_BUFFER_SIZE) as dst:
+                while True:
+                    read_size = src.readinto(buffer)
+                    if not read_size:
+                        break
+                    dst.write(view[:read_size])
+
+def extract_entries_parallel(zip_path, entry_infos, output_dir):
+    """
+    zipエントリをスレッドプールで並列に展開する
+    
+    Args:
+        zip_path (str): zipファイルのパス
+        entry_infos (list): 展開するエントリのZipInfoのリスト
+        output_dir (str): 出力ディレクトリのパス
+    """
+    # zlibの伸張はGILを解放するため、エントリをワーカー数に分けて展開と書き込みを重ねる
+    groups = [entry_infos[i::EXTRACT_WORKERS] for i in range(EXTRACT_WORKERS)]
+    with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as executor:
+        futures = [executor.submit(extract_entries, zip_path, group, output_dir) for group in groups if group]
+        for future in futures:
+            future.result()
+
+def _strip_zip64_extra(extra):
+    """
+    拡張フィールドからZIP64のレコードを取り除く
+    
+    Args:
+        extra (bytes): 元のエントリの拡張フィールド
+        
+    Returns:
+        bytes: ZIP64以外のレコードだけを残した拡張フィールド
+    """
+    records = []
+    position = 0
+    while position + 4 <= len(extra):
+        header_id, data_size = struct.unpack_from('<HH', extra, position)
+        end = position + 4 + data_size
+        if header_id != ZIP64_EXTRA_ID:
+            records.append(extra[position:end])
+        position = end
+    return b''.join(records)
+
+def copy_entry_raw(original_zip, entry_info, new_zip):
+    """
+    エントリの圧縮データを展開・再圧縮せずにそのまま新しいzipへコピーする
+    
+    Args:
+        original_zip (zipfile.ZipFile): コピー元のzip
+        entry_info (zipfile.ZipInfo): コピーするエントリ
+        new_zip (zipfile.ZipFile): 書き込み中のzip
+        
+    Returns:
+        bool: コピーできた場合True（通常のコピーに切り替える場合False）
+    """
+    # 暗号化されたエントリや未対応の圧縮形式は対象外
+    if entry_info.flag_bits & 0x1 or entry_info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        return False
+    
+    # 書き込み側のエントリ一覧を直接更新するため、想定した属性がないzipfileでは通常のコピーに切り替える
+    if not all(hasattr(new_zip, name) for name in ('fp', 'start_dir', 'filelist', 'NameToInfo')):
+        return False
+    
+    original_zip.fp.seek(entry_info.header_offset)
+    offset = _local_data_offset(original_zip.fp.read(LOCAL_HEADER.size), entry_info.header_offset)
+    if offset is None:
+        return False
+    
+    # 圧縮形式・CRC・サイズ・拡張フィールドは元のエントリの値をそのまま使う
+    copy_info = zipfile.ZipInfo(entry_info.filename, date_time=entry_info.date_time)
+    copy_info.compress_type = entry_info.compress_type
+    copy_info.flag_bits = entry_info.flag_bits & ~0x08  # サイズはヘッダに書くためデータディスクリプタは使わない
+    copy_info.CRC = entry_info.CRC
+    copy_info.compress_size = entry_info.compress_size
+    copy_info.file_size = entry_info.file_size
+    copy_info.extra = _strip_zip64_extra(entry_info.extra)
+    copy_info.comment = entry_info.comment
+    copy_info.internal_attr = entry_info.internal_attr
+    copy_info.external_attr = entry_info.external_attr
+    copy_info.create_system = entry_info.create_system
+    zip64 = copy_info.file_size > zipfile.ZIP64_LIMIT or copy_info.compress_size > zipfile.ZIP64_LIMIT
+    
+    new_zip.fp.seek(new_zip.start_dir)
+    copy_info.header_offset = new_zip.fp.tell()
+    new_zip.fp.write(copy_info.FileHeader(zip64))
+    
+    original_zip.fp.seek(offset)
+    remaining = entry_info.compress_size
+    while remaining > 0:
+        chunk = original_zip.fp.read(min(remaining, COPY_BUFFER_SIZE))
+        if not chunk:
+            raise EOFError(f"zipデータが途中で終了しています: {entry_info.filename}")
+        new_zip.fp.write(chunk)
+        remaining -= len(chunk)
+    
+    # 中央ディレクトリに載るよう書き込み側のエントリ一覧へ登録
+    new_zip.filelist.append(copy_info)
+    new_zip.NameToInfo[copy_info.filename] = copy_info
+    new_zip.start_dir = new_zip.fp.tell()
+    return True
+
+def copy_entry(original_zip, entry_info, new_zip, stored_extensions=()):
+    """
+    エントリを新しいzipへコピーする（可能なら圧縮データのまま、無理ならチャンク単位で再圧縮）
+    
+    Args:
+        original_zip (zipfile.ZipFile): コピー元のzip
+        entry_info (zipfile.ZipInfo): コピーするエントリ
+        new_zip (zipfile.ZipFile): 書き込み中のzip
+        stored_extensions (tuple): 再圧縮せずに格納する拡張子
+    """
+    if copy_entry_raw(original_zip, entry_info, new_zip):
+        return
+    
+    # 圧縮データのまま複製できない場合はメモリに展開せずチャンク単位でコピー
+    copy_info = zipfile.ZipInfo(entry_info.filename, date_time=entry_info.date_time)
+    if entry_info.filename.lower().endswith(stored_extensions):
+        copy_info.compress_type = zipfile.ZIP_STORED
+    else:
+        copy_info.compress_type = zipfile.ZIP_DEFLATED
+    # ZipInfoを渡して書き込む場合はZipFileの圧縮レベルが引き継がれないため明示する
+    copy_info._compresslevel = new_zip.compresslevel
+    copy_info.file_size = entry_info.file_size
+    with original_zip.open(entry_info) as src, new_zip.open(copy_info, 'w') as dst:
+        shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
\ No newline at end of file